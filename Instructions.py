@@ -1,8 +1,8 @@
 import streamlit as st
-from database.db_setup import init_database
+from database.db_setup import ensure_initialized
 
 # Initialize DB on startup
-init_database()
+ensure_initialized()
 
 st.set_page_config(
     page_title="Instructions - Agricultural Management System",
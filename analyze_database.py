@@ -1,10 +1,27 @@
 import sqlite3
 import json
 import pandas as pd
+from database.db_setup import decode_coordinates
+
+# orjson is much faster for the per-record form_data parsing below; its
+# JSONDecodeError subclasses json.JSONDecodeError so the handlers still apply
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+def parse_form_data(raw):
+    """Decode a form_data blob, returning None if it is not valid JSON"""
+    try:
+        return json_loads(raw)
+    except json.JSONDecodeError:
+        return None
 
 def analyze_database():
     """Analyze the current database structure and data"""
     conn = sqlite3.connect('agricultural_data.db')
+    conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
     print("=== DATABASE SCHEMA ANALYSIS ===\n")
@@ -25,34 +42,30 @@ def analyze_database():
     for col in columns:
         print(f"  - {col[1]} ({col[2]}) {'NOT NULL' if col[3] else ''} {'PRIMARY KEY' if col[5] else ''}")
     
-    # Get sample data from form_responses
-    cursor.execute("SELECT * FROM form_responses LIMIT 3")
-    form_data = cursor.fetchall()
+    # Get sample data from form_responses; pandas formats the whole table at once
+    form_df = pd.read_sql_query("""
+        SELECT id, farmer_id, district, village, ea_code, season_year,
+               crop_type, form_data, submission_date
+        FROM form_responses LIMIT 3
+    """, conn)
     
-    print(f"\nTotal form_responses records: {len(form_data)}")
-    if form_data:
+    print(f"\nTotal form_responses records: {len(form_df)}")
+    if not form_df.empty:
         print("\nSample form_responses records:")
-        for i, record in enumerate(form_data):
-            print(f"\nRecord {i+1}:")
-            print(f"  ID: {record[0]}")
-            print(f"  Farmer ID: {record[1]}")
-            print(f"  District: {record[2]}")
-            print(f"  Village: {record[3]}")
-            print(f"  EA Code: {record[4]}")
-            print(f"  Season/Year: {record[5]}")
-            print(f"  Crop Type: {record[6]}")
-            print(f"  Submission Date: {record[8]}")
-            
-            # Parse and display JSON form data
-            try:
-                json_data = json.loads(record[7])
-                print(f"  JSON Form Data Keys: {list(json_data.keys())}")
-                if 'selected_crops' in json_data:
-                    print(f"  Selected Crops: {json_data['selected_crops']}")
-                if 'crop_data' in json_data:
-                    print(f"  Crop Data Keys: {list(json_data['crop_data'].keys())}")
-            except json.JSONDecodeError:
-                print(f"  Form Data (raw): {record[7][:100]}...")
+        print(form_df.drop(columns=['form_data']).to_string(index=False))
+        
+        # Parse and display JSON form data
+        parsed = form_df['form_data'].map(parse_form_data)
+        for record_id, raw, json_data in zip(form_df['id'], form_df['form_data'], parsed):
+            print(f"\nRecord {record_id} form data:")
+            if json_data is None:
+                print(f"  Form Data (raw): {raw[:100]}...")
+                continue
+            print(f"  JSON Form Data Keys: {list(json_data.keys())}")
+            if 'selected_crops' in json_data:
+                print(f"  Selected Crops: {json_data['selected_crops']}")
+            if 'crop_data' in json_data:
+                print(f"  Crop Data Keys: {list(json_data['crop_data'].keys())}")
     
     print("\n=== FIELD_BOUNDARIES TABLE ANALYSIS ===\n")
     
@@ -64,62 +77,52 @@ def analyze_database():
         print(f"  - {col[1]} ({col[2]}) {'NOT NULL' if col[3] else ''} {'PRIMARY KEY' if col[5] else ''}")
     
     # Get sample data from field_boundaries
-    cursor.execute("SELECT * FROM field_boundaries LIMIT 3")
-    boundary_data = cursor.fetchall()
-    
-    print(f"\nTotal field_boundaries records: {len(boundary_data)}")
-    if boundary_data:
+    boundary_df = pd.read_sql_query("""
+        SELECT id, farmer_id, field_name, field_type, crop_type,
+               coordinates, area_estimate, creation_date
+        FROM field_boundaries LIMIT 3
+    """, conn)
+    
+    print(f"\nTotal field_boundaries records: {len(boundary_df)}")
+    if not boundary_df.empty:
         print("\nSample field_boundaries records:")
-        for i, record in enumerate(boundary_data):
-            print(f"\nBoundary {i+1}:")
-            print(f"  ID: {record[0]}")
-            print(f"  Farmer ID: {record[1]}")
-            print(f"  Field Name: {record[2]}")
-            print(f"  Field Type: {record[3]}")
-            print(f"  Crop Type: {record[4]}")
-            print(f"  Area Estimate: {record[6]}")
-            print(f"  Creation Date: {record[8]}")
-            print(f"  Coordinates Length: {len(record[5]) if record[5] else 0}")
+        boundary_df['coordinate_points'] = boundary_df['coordinates'].map(
+            lambda value: len(decode_coordinates(value)))
+        print(boundary_df.drop(columns=['coordinates']).to_string(index=False))
     
     print("\n=== RELATIONSHIP ANALYSIS ===\n")
     
-    # Check potential relationships
-    cursor.execute("SELECT DISTINCT farmer_id FROM form_responses")
-    form_farmers = {row[0] for row in cursor.fetchall()}
+    # Collect farmer+crop combinations for both tables in one aggregated pass;
+    # the distinct farmer and crop sets are derived from it below
+    cursor.execute("""
+        SELECT 'form' AS src, farmer_id, crop_type, COUNT(*) AS record_count
+        FROM form_responses
+        GROUP BY farmer_id, crop_type
+        UNION ALL
+        SELECT 'boundary' AS src, farmer_id, crop_type, COUNT(*) AS record_count
+        FROM field_boundaries
+        GROUP BY farmer_id, crop_type
+    """)
+    combinations = cursor.fetchall()
+    form_combinations = [row[1:] for row in combinations if row[0] == 'form']
+    boundary_combinations = [row[1:] for row in combinations if row[0] == 'boundary']
     
-    cursor.execute("SELECT DISTINCT farmer_id FROM field_boundaries")
-    boundary_farmers = {row[0] for row in cursor.fetchall()}
+    # Check potential relationships
+    form_farmers = {combo[0] for combo in form_combinations}
+    boundary_farmers = {combo[0] for combo in boundary_combinations}
     
     print(f"Farmers in form_responses: {len(form_farmers)}")
     print(f"Farmers in field_boundaries: {len(boundary_farmers)}")
     print(f"Common farmers: {len(form_farmers.intersection(boundary_farmers))}")
     
     # Check crop type overlap
-    cursor.execute("SELECT DISTINCT crop_type FROM form_responses")
-    form_crops = {row[0] for row in cursor.fetchall()}
-    
-    cursor.execute("SELECT DISTINCT crop_type FROM field_boundaries")
-    boundary_crops = {row[0] for row in cursor.fetchall()}
+    form_crops = {combo[1] for combo in form_combinations}
+    boundary_crops = {combo[1] for combo in boundary_combinations}
     
     print(f"\nCrop types in form_responses: {form_crops}")
     print(f"Crop types in field_boundaries: {boundary_crops}")
     print(f"Common crop types: {form_crops.intersection(boundary_crops)}")
     
-    # Check for potential farmer_id + crop_type combinations
-    cursor.execute("""
-        SELECT f.farmer_id, f.crop_type, COUNT(*) as form_count
-        FROM form_responses f
-        GROUP BY f.farmer_id, f.crop_type
-    """)
-    form_combinations = cursor.fetchall()
-    
-    cursor.execute("""
-        SELECT b.farmer_id, b.crop_type, COUNT(*) as boundary_count
-        FROM field_boundaries b
-        GROUP BY b.farmer_id, b.crop_type
-    """)
-    boundary_combinations = cursor.fetchall()
-    
     print(f"\nFarmer+Crop combinations in forms: {len(form_combinations)}")
     print(f"Farmer+Crop combinations in boundaries: {len(boundary_combinations)}")
     
@@ -1,9 +1,30 @@
 import sqlite3
 import json
+import pandas as pd
+from database.db_setup import CROP_PRODUCTION_SELECT, decode_coordinates
+
+# orjson is much faster for the per-record form_data parsing below; its
+# JSONDecodeError subclasses json.JSONDecodeError so the handlers still apply
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# Only a sample is printed, so cap the rows pulled into Python
+SAMPLE_LIMIT = 50
+
+def parse_form_data(raw):
+    """Decode a form_data blob, returning None if it is not valid JSON"""
+    try:
+        return json_loads(raw)
+    except json.JSONDecodeError:
+        return None
 
 def analyze_database():
     """Analyze the current database structure and data"""
     conn = sqlite3.connect('agricultural_data.db')
+    conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
     print("=== DATABASE SCHEMA ANALYSIS ===\n")
@@ -25,37 +46,38 @@ def analyze_database():
     for col in form_columns:
         print(f"  - Column {col[0]}: {col[1]} ({col[2]}) {'NOT NULL' if col[3] else ''} {'PRIMARY KEY' if col[5] else ''}")
     
-    # Get sample data from form_responses
-    cursor.execute("SELECT * FROM form_responses")
-    form_data = cursor.fetchall()
-    
-    print(f"\nTotal form_responses records: {len(form_data)}")
-    if form_data:
-        print("\nSample form_responses records:")
-        for i, record in enumerate(form_data):
-            print(f"\nRecord {i+1}:")
-            print(f"  ID: {record[0]}")
-            print(f"  Farmer ID: {record[1]}")
-            print(f"  District: {record[2]}")
-            print(f"  Village: {record[3]}")
-            print(f"  EA Code: {record[4]}")
-            print(f"  Season/Year: {record[5]}")
-            print(f"  Crop Type (field): {record[6]}")
-            print(f"  Submission Date: {record[8]}")
-            
-            # Parse and display JSON form data
-            try:
-                json_data = json.loads(record[7])
-                print(f"  JSON Form Data Keys: {list(json_data.keys())}")
-                if 'selected_crops' in json_data:
-                    print(f"  Selected Crops: {json_data['selected_crops']}")
-                if 'crop_data' in json_data:
-                    print(f"  Crop Data Keys: {list(json_data['crop_data'].keys())}")
-                    # Show sample crop data structure
-                    for crop, data in json_data['crop_data'].items():
-                        print(f"    {crop} data keys: {list(data.keys())[:5]}...")  # Show first 5 keys
-            except json.JSONDecodeError:
-                print(f"  Form Data (raw): {record[7][:100]}...")
+    cursor.execute("SELECT COUNT(*) FROM form_responses")
+    form_count = cursor.fetchone()[0]
+    
+    # Get sample data from form_responses; pandas formats the whole sample at once
+    form_df = pd.read_sql_query("""
+        SELECT id, farmer_id, district, village, ea_code, season_year,
+               crop_type, form_data, submission_date
+        FROM form_responses
+        LIMIT ?
+    """, conn, params=(SAMPLE_LIMIT,))
+    # Parse form_data once for the sample section below
+    form_df['parsed'] = form_df['form_data'].map(parse_form_data)
+    
+    print(f"\nTotal form_responses records: {form_count}")
+    if form_count:
+        print(f"\nSample form_responses records (up to {SAMPLE_LIMIT}):")
+        print(form_df.drop(columns=['form_data', 'parsed']).to_string(index=False))
+        
+        # Display parsed JSON form data
+        for record_id, raw, json_data in zip(form_df['id'], form_df['form_data'], form_df['parsed']):
+            print(f"\nRecord {record_id} form data:")
+            if json_data is None:
+                print(f"  Form Data (raw): {raw[:100]}...")
+                continue
+            print(f"  JSON Form Data Keys: {list(json_data.keys())}")
+            if 'selected_crops' in json_data:
+                print(f"  Selected Crops: {json_data['selected_crops']}")
+            if 'crop_data' in json_data:
+                print(f"  Crop Data Keys: {list(json_data['crop_data'].keys())}")
+                # Show sample crop data structure
+                for crop, data in json_data['crop_data'].items():
+                    print(f"    {crop} data keys: {list(data.keys())[:5]}...")  # Show first 5 keys
     
     print("\n=== FIELD_BOUNDARIES TABLE ANALYSIS ===\n")
     
@@ -66,43 +88,36 @@ def analyze_database():
     for col in boundary_columns:
         print(f"  - Column {col[0]}: {col[1]} ({col[2]}) {'NOT NULL' if col[3] else ''} {'PRIMARY KEY' if col[5] else ''}")
     
+    cursor.execute("SELECT COUNT(*) FROM field_boundaries")
+    boundary_count = cursor.fetchone()[0]
+    
     # Get sample data from field_boundaries
-    cursor.execute("SELECT * FROM field_boundaries")
-    boundary_data = cursor.fetchall()
-    
-    print(f"\nTotal field_boundaries records: {len(boundary_data)}")
-    if boundary_data:
-        print("\nSample field_boundaries records:")
-        for i, record in enumerate(boundary_data):
-            print(f"\nBoundary {i+1}:")
-            print(f"  ID: {record[0]}")
-            print(f"  Farmer ID: {record[1]}")
-            print(f"  Field Name: {record[2]}")
-            print(f"  Field Type: {record[3]}")
-            
-            # Handle columns based on actual structure
-            num_cols = len(record)
-            print(f"  Total columns in record: {num_cols}")
-            
-            if num_cols >= 5:
-                print(f"  Column 4 (coordinates?): {str(record[4])[:100]}...")
-            if num_cols >= 6:
-                print(f"  Column 5 (area?): {record[5]}")
-            if num_cols >= 7:
-                print(f"  Column 6 (notes?): {record[6]}")
-            if num_cols >= 8:
-                print(f"  Column 7 (date?): {record[7]}")
-            if num_cols >= 9:
-                print(f"  Column 8 (crop_type?): {record[8]}")
+    # Select by name: older databases have crop_type appended as the last column
+    boundary_df = pd.read_sql_query("""
+        SELECT id, farmer_id, field_name, field_type, crop_type,
+               coordinates, area_estimate, notes, creation_date
+        FROM field_boundaries
+        LIMIT ?
+    """, conn, params=(SAMPLE_LIMIT,))
+    
+    print(f"\nTotal field_boundaries records: {boundary_count}")
+    if boundary_count:
+        print(f"\nSample field_boundaries records (up to {SAMPLE_LIMIT}):")
+        boundary_df['coordinates'] = boundary_df['coordinates'].map(
+            lambda value: str(decode_coordinates(value))[:40] + '...')
+        print(boundary_df.to_string(index=False))
     
     print("\n=== RELATIONSHIP ANALYSIS ===\n")
     
-    # Check potential relationships - farmer_id analysis
-    cursor.execute("SELECT DISTINCT farmer_id FROM form_responses")
-    form_farmers = {row[0] for row in cursor.fetchall()}
-    
-    cursor.execute("SELECT DISTINCT farmer_id FROM field_boundaries")
-    boundary_farmers = {row[0] for row in cursor.fetchall()}
+    # Check potential relationships - farmer_id analysis, both tables in one pass
+    cursor.execute("""
+        SELECT DISTINCT 'form' AS src, farmer_id FROM form_responses
+        UNION ALL
+        SELECT DISTINCT 'boundary' AS src, farmer_id FROM field_boundaries
+    """)
+    farmer_rows = cursor.fetchall()
+    form_farmers = {row[1] for row in farmer_rows if row[0] == 'form'}
+    boundary_farmers = {row[1] for row in farmer_rows if row[0] == 'boundary'}
     
     print(f"Farmers in form_responses: {len(form_farmers)}")
     print(f"Form farmer IDs: {form_farmers}")
@@ -113,28 +128,36 @@ def analyze_database():
     # Analyze form_responses crop storage pattern
     print(f"\n=== CROP DATA STORAGE ANALYSIS ===\n")
     
-    if form_data:
-        for i, record in enumerate(form_data):
-            try:
-                json_data = json.loads(record[7])
-                selected_crops = json_data.get('selected_crops', [])
-                crop_data = json_data.get('crop_data', {})
-                
-                print(f"Form record {i+1}:")
-                print(f"  Farmer: {record[1]}")
-                print(f"  Crops selected: {selected_crops}")
-                print(f"  Crop data available for: {list(crop_data.keys())}")
-                
-                # Show production data for each crop
-                for crop in crop_data:
-                    crop_info = crop_data[crop]
-                    qty = crop_info.get('qty_harvested', 'N/A')
-                    unit = crop_info.get('unit', 'N/A')
-                    print(f"    {crop}: {qty} {unit}")
-                
-                print()
-            except json.JSONDecodeError:
-                continue
+    # Per-crop production figures are extracted by SQLite, no Python-side parsing.
+    # The view's SELECT is inlined so this also works on databases that predate it.
+    cursor.execute(f"""
+        SELECT form_id, crop, qty_harvested, unit
+        FROM ({CROP_PRODUCTION_SELECT})
+        WHERE form_id IN (SELECT id FROM form_responses LIMIT ?)
+    """, (SAMPLE_LIMIT,))
+    crops_by_form = {}
+    for form_id, crop, qty, unit in cursor.fetchall():
+        crops_by_form.setdefault(form_id, []).append((crop, qty, unit))
+    
+    # Every sampled form is listed, numbered by its position in the sample;
+    # selected_crops comes from the form_data already parsed above
+    for i, (record_id, farmer_id, json_data) in enumerate(
+            zip(form_df['id'], form_df['farmer_id'], form_df['parsed'])):
+        if json_data is None:
+            continue
+        crops = crops_by_form.get(record_id, [])
+        print(f"Form record {i+1}:")
+        print(f"  Farmer: {farmer_id}")
+        print(f"  Crops selected: {json_data.get('selected_crops', [])}")
+        print(f"  Crop data available for: {[crop for crop, _, _ in crops]}")
+        
+        # Show production data for each crop
+        for crop, qty, unit in crops:
+            qty = 'N/A' if qty is None else qty
+            unit = 'N/A' if unit is None else unit
+            print(f"    {crop}: {qty} {unit}")
+        
+        print()
     
     conn.close()
     
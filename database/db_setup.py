@@ -1,12 +1,134 @@
+import atexit
+import contextlib
+import functools
+import json
 import sqlite3
+import struct
+import threading
 import os
 
+DB_PATH = 'agricultural_data.db'
+
+# One row per crop in each form_responses.crop_data object. The production
+# figures are nested per crop, so they can't become per-row generated columns;
+# JSON1 pulls them out in SQL instead of json.loads-ing every record in Python.
+CROP_PRODUCTION_SELECT = '''
+    SELECT f.id AS form_id,
+           f.farmer_id,
+           c.key AS crop,
+           json_extract(c.value, '$.qty_harvested') AS qty_harvested,
+           json_extract(c.value, '$.unit') AS unit,
+           json_extract(c.value, '$.price_per_unit') AS price_per_unit
+    FROM form_responses AS f, json_each(f.form_data, '$.crop_data') AS c
+    WHERE json_valid(f.form_data)
+'''
+
+# Both counts in one statement; the fixed text keeps it in the connection's
+# statement cache so it is only prepared once per process
+_STATS_SQL = '''
+    SELECT (SELECT COUNT(*) FROM form_responses),
+           (SELECT COUNT(*) FROM field_boundaries)
+'''
+
+# Stored in PRAGMA user_version; bump it when the index set changes so existing
+# databases get re-ANALYZEd on the next init_database()
+SCHEMA_VERSION = 2
+
+# Streamlit serves each session from its own thread, all sharing one connection;
+# writers take this lock so their transactions don't interleave
+_write_lock = threading.Lock()
+
+
+def close_connection(conn):
+    """Close a connection, letting SQLite refresh planner stats first"""
+    conn.execute("PRAGMA optimize")
+    conn.close()
+
+
+@functools.lru_cache(maxsize=1)
+def get_connection():
+    """Return the shared SQLite connection, opening it on first use"""
+    # One connection per process: reopening per call re-reads the WAL header and
+    # remaps the shm file every time. Autocommit mode, so writes that must be
+    # atomic open an explicit BEGIN.
+    conn = sqlite3.connect(DB_PATH,
+                           check_same_thread=False,
+                           isolation_level=None,
+                           cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    conn.executescript('''
+        PRAGMA synchronous=NORMAL;
+        PRAGMA mmap_size=268435456;
+        PRAGMA cache_size=-20000;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA foreign_keys=ON;
+    ''')
+    atexit.register(close_connection, conn)
+    return conn
+
+
+@contextlib.contextmanager
+def transaction():
+    """Run the enclosed writes on the shared connection as one transaction"""
+    conn = get_connection()
+    with _write_lock:
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+
+def encode_coordinates(coordinates):
+    """Pack [[lng, lat], ...] pairs into a little-endian float64 BLOB"""
+    # float64 like WKB: float32 only resolves ~1.5 m at Samoa's longitudes
+    flat = [float(value) for point in coordinates for value in point[:2]]
+    return struct.pack(f'<{len(flat)}d', *flat)
+
+
+def decode_coordinates(value):
+    """Unpack stored coordinates back into a list of [lng, lat] pairs
+
+    Rows saved before the BLOB format hold JSON text and are decoded as such.
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        return json.loads(value)
+    flat = struct.unpack(f'<{len(value) // 8}d', value)
+    return [list(flat[i:i + 2]) for i in range(0, len(flat), 2)]
+
+
+def create_indexes(conn):
+    """Create the lookup indexes if missing; cheap no-ops once they exist"""
+    # Farmer/crop lookups and GROUP BYs used by the viewer, the analysis scripts
+    # and the production-boundary linker, plus the dashboard's newest-first sort
+    conn.executescript('''
+        CREATE INDEX IF NOT EXISTS idx_form_farmer ON form_responses(farmer_id);
+        CREATE INDEX IF NOT EXISTS idx_form_farmer_crop ON form_responses(farmer_id, crop_type);
+        CREATE INDEX IF NOT EXISTS idx_form_submission_date ON form_responses(submission_date);
+        CREATE INDEX IF NOT EXISTS idx_bound_farmer ON field_boundaries(farmer_id);
+        CREATE INDEX IF NOT EXISTS idx_bound_farmer_crop ON field_boundaries(farmer_id, crop_type);
+    ''')
+
 
 def init_database():
     """Initialize the SQLite database with required tables"""
-    conn = sqlite3.connect('agricultural_data.db')
+    conn = get_connection()
     cursor = conn.cursor()
 
+    # Larger pages mean fewer page reads/writes per JSON-heavy row. Only takes
+    # effect on a brand-new file, so it must come before WAL and the tables.
+    cursor.execute("PRAGMA page_size=8192")
+
+    # WAL lets readers and the writer run concurrently and, with synchronous=NORMAL,
+    # commits skip the rollback-journal fsyncs. WAL is persistent, unlike the
+    # per-connection PRAGMAs in get_connection(). Note: to change page_size later,
+    # switch to journal_mode=DELETE first, set page_size, VACUUM, then re-enable WAL.
+    cursor.execute("PRAGMA journal_mode=WAL")
+
     # Create form_responses table with flexible JSON structure
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS form_responses (
@@ -30,30 +152,45 @@ def init_database():
             field_name TEXT NOT NULL,
             field_type TEXT NOT NULL,
             crop_type TEXT NOT NULL,
-            coordinates TEXT NOT NULL,
+            coordinates BLOB NOT NULL,
             area_estimate REAL,
             notes TEXT,
             creation_date TEXT NOT NULL
         )
     ''')
 
-    conn.commit()
-    conn.close()
+    create_indexes(conn)
 
+    cursor.execute(f"CREATE VIEW IF NOT EXISTS crop_production AS {CROP_PRODUCTION_SELECT}")
 
-def get_database_stats():
-    """Get basic statistics about the database"""
-    try:
-        conn = sqlite3.connect('agricultural_data.db')
-        cursor = conn.cursor()
+    # Populate sqlite_stat1 so the query planner actually picks the indexes. Only
+    # needed once per database file and index set (user_version records that it
+    # ran); after that the PRAGMA optimize in close_connection() keeps the stats
+    # fresh.
+    if cursor.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        cursor.execute("ANALYZE")
+        cursor.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
 
-        cursor.execute("SELECT COUNT(*) FROM form_responses")
-        form_count = cursor.fetchone()[0]
 
-        cursor.execute("SELECT COUNT(*) FROM field_boundaries")
-        field_count = cursor.fetchone()[0]
+def ensure_initialized():
+    """Run init_database() once per Streamlit server process, not on every rerun"""
+    # Imported here so db_setup stays usable without Streamlit loaded. Streamlit
+    # keys the cache on the function's qualified name and source, so redefining
+    # it per call still hits the same entry.
+    import streamlit as st
 
-        conn.close()
+    @st.cache_resource(show_spinner=False)
+    def _initialized():
+        init_database()
+        return True
+
+    return _initialized()
+
+
+def get_database_stats():
+    """Get basic statistics about the database"""
+    try:
+        form_count, field_count = get_connection().execute(_STATS_SQL).fetchone()
 
         return {
             'form_responses': form_count,
@@ -71,20 +208,43 @@ def get_database_stats():
 
 def clear_all_data():
     """Clear all data from the database (use with caution)"""
+    conn = get_connection()
     try:
-        conn = sqlite3.connect('agricultural_data.db')
-        cursor = conn.cursor()
-
-        cursor.execute("DELETE FROM form_responses")
-        cursor.execute("DELETE FROM field_boundaries")
-
-        conn.commit()
-        conn.close()
-        return True
+        # One transaction for both deletes
+        with _write_lock:
+            conn.executescript('''
+                BEGIN;
+                DELETE FROM form_responses;
+                DELETE FROM field_boundaries;
+                COMMIT;
+            ''')
     except Exception as e:
+        if conn.in_transaction:
+            conn.rollback()
         print(f"Error clearing database: {str(e)}")
         return False
 
+    # VACUUM hands the freed pages back and rebuilds the indexes densely. The
+    # rows are already gone by now, so a failed VACUUM (e.g. another session
+    # has a statement open on the shared connection) is only logged.
+    try:
+        with _write_lock:
+            conn.execute("VACUUM")
+    except sqlite3.Error as e:
+        print(f"Could not VACUUM the cleared database: {str(e)}")
+
+    # Drop cached query results so nothing stale outlives the data. Imported
+    # here so db_setup stays usable without Streamlit installed; the data is
+    # cleared either way, so this doesn't decide the result.
+    try:
+        import streamlit as st
+        st.cache_data.clear()
+    except ImportError:
+        pass
+    except Exception as e:
+        print(f"Could not clear cached query results: {str(e)}")
+    return True
+
 
 if __name__ == "__main__":
     # Initialize database when run directly
@@ -0,0 +1,60 @@
+import pandas as pd
+import streamlit as st
+
+from database.db_setup import decode_coordinates, get_connection, get_database_stats
+
+# Data is append-mostly, so a short TTL trades a little staleness for skipping
+# the SQL + DataFrame round trip on every rerun
+CACHE_TTL = 300
+
+RECENT_FORM_RESPONSES_SQL = """
+    SELECT id, farmer_id, district, village, crop_type, submission_date
+    FROM form_responses
+    ORDER BY submission_date DESC
+    LIMIT ?
+"""
+
+RECENT_FIELD_BOUNDARIES_SQL = """
+    SELECT id, farmer_id, field_name, field_type, crop_type, area_estimate, creation_date
+    FROM field_boundaries
+    ORDER BY creation_date DESC
+    LIMIT ?
+"""
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def recent_form_responses(limit=5):
+    """Most recent form responses, newest first"""
+    return pd.read_sql_query(RECENT_FORM_RESPONSES_SQL, get_connection(), params=(limit,))
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def recent_field_boundaries(limit=5):
+    """Most recent field boundaries, newest first"""
+    return pd.read_sql_query(RECENT_FIELD_BOUNDARIES_SQL, get_connection(), params=(limit,))
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def farmer_records(farmer_id):
+    """All form responses and field boundaries for one farmer"""
+    conn = get_connection()
+    form_df = pd.read_sql_query(
+        "SELECT * FROM form_responses WHERE farmer_id = ?", conn, params=(farmer_id,))
+    field_df = pd.read_sql_query(
+        "SELECT * FROM field_boundaries WHERE farmer_id = ?", conn, params=(farmer_id,))
+    field_df['coordinates'] = field_df['coordinates'].map(decode_coordinates)
+    return form_df, field_df
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def database_stats():
+    """Cached version of get_database_stats"""
+    return get_database_stats()
+
+
+def clear_query_cache():
+    """Drop cached query results after the data has been modified"""
+    recent_form_responses.clear()
+    recent_field_boundaries.clear()
+    farmer_records.clear()
+    database_stats.clear()
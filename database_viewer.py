@@ -4,67 +4,90 @@ Database viewer and editor for agricultural_data.db
 Provides functions to view, query, and modify the SQLite database
 """
 
+import csv
 import sqlite3
+import sys
 import json
 import pandas as pd
 from datetime import datetime
+from database.db_setup import get_connection
+from database.queries import (recent_form_responses, recent_field_boundaries,
+                              farmer_records, clear_query_cache,
+                              RECENT_FORM_RESPONSES_SQL, RECENT_FIELD_BOUNDARIES_SQL)
+
+# Above this many rows results are streamed to stdout instead of being
+# formatted as one DataFrame string in memory
+STREAM_LIMIT = 200
+
+# Table names can't be bound as parameters, so the viewer only touches these
+# tables through fixed statement text, which also keeps SQLite's statement
+# cache hitting instead of re-preparing a new string per call
+_TABLE_COUNTS_SQL = """
+    SELECT 'form_responses', COUNT(*) FROM form_responses
+    UNION ALL
+    SELECT 'field_boundaries', COUNT(*) FROM field_boundaries
+"""
+_TABLE_COLUMNS_SQL = """
+    SELECT m.name, p.name
+    FROM sqlite_master AS m, pragma_table_info(m.name) AS p
+    WHERE m.type = 'table'
+    ORDER BY m.rowid, p.cid
+"""
+_DELETE_SQL = {
+    'form_responses': "DELETE FROM form_responses WHERE id = ?",
+    'field_boundaries': "DELETE FROM field_boundaries WHERE id = ?",
+}
 
 def view_tables():
     """Show all tables in the database"""
-    conn = sqlite3.connect('agricultural_data.db')
+    conn = get_connection()
     cursor = conn.cursor()
     
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-    tables = cursor.fetchall()
+    # Row counts and column lists for every table in two queries total
+    cursor.execute(_TABLE_COUNTS_SQL)
+    counts = dict(cursor.fetchall())
+    
+    cursor.execute(_TABLE_COLUMNS_SQL)
+    tables = {}
+    for table, column in cursor.fetchall():
+        tables.setdefault(table, []).append(column)
     
     print("Available tables:")
-    for table in tables:
-        print(f"- {table[0]}")
-        
-        # Get row count
-        cursor.execute(f"SELECT COUNT(*) FROM {table[0]}")
-        count = cursor.fetchone()[0]
-        print(f"  Rows: {count}")
-        
-        # Show column structure
-        cursor.execute(f"PRAGMA table_info({table[0]})")
-        columns = cursor.fetchall()
-        print(f"  Columns: {[col[1] for col in columns]}")
+    for table, columns in tables.items():
+        print(f"- {table}")
+        if table in counts:
+            print(f"  Rows: {counts[table]}")
+        print(f"  Columns: {columns}")
         print()
-    
-    conn.close()
+
+def stream_query(query, params=()):
+    """Print query results as tab-separated rows, one row at a time"""
+    cursor = get_connection().execute(query, params)
+    writer = csv.writer(sys.stdout, dialect='excel-tab')
+    writer.writerow([column[0] for column in cursor.description])
+    writer.writerows(cursor)
 
 def view_form_responses(limit=5):
-    """View recent form responses"""
-    conn = sqlite3.connect('agricultural_data.db')
+    """View recent form responses (streamed, returning None, above STREAM_LIMIT)"""
+    if limit > STREAM_LIMIT:
+        print(f"Recent {limit} form responses:")
+        stream_query(RECENT_FORM_RESPONSES_SQL, (limit,))
+        return None
     
-    query = f"""
-    SELECT id, farmer_id, district, village, crop_type, submission_date 
-    FROM form_responses 
-    ORDER BY submission_date DESC 
-    LIMIT {limit}
-    """
-    
-    df = pd.read_sql_query(query, conn)
-    conn.close()
+    df = recent_form_responses(limit)
     
     print(f"Recent {limit} form responses:")
     print(df.to_string(index=False))
     return df
 
 def view_field_boundaries(limit=5):
-    """View recent field boundaries"""
-    conn = sqlite3.connect('agricultural_data.db')
-    
-    query = f"""
-    SELECT id, farmer_id, field_name, field_type, crop_type, area_estimate, creation_date
-    FROM field_boundaries 
-    ORDER BY creation_date DESC 
-    LIMIT {limit}
-    """
+    """View recent field boundaries (streamed, returning None, above STREAM_LIMIT)"""
+    if limit > STREAM_LIMIT:
+        print(f"Recent {limit} field boundaries:")
+        stream_query(RECENT_FIELD_BOUNDARIES_SQL, (limit,))
+        return None
     
-    df = pd.read_sql_query(query, conn)
-    conn.close()
+    df = recent_field_boundaries(limit)
     
     print(f"Recent {limit} field boundaries:")
     print(df.to_string(index=False))
@@ -72,27 +95,21 @@ def view_field_boundaries(limit=5):
 
 def search_by_farmer_id(farmer_id):
     """Find all records for a specific farmer"""
-    conn = sqlite3.connect('agricultural_data.db')
+    form_df, field_df = farmer_records(farmer_id)
     
     # Form responses
     print(f"Form responses for farmer {farmer_id}:")
-    form_query = "SELECT * FROM form_responses WHERE farmer_id = ?"
-    form_df = pd.read_sql_query(form_query, conn, params=(farmer_id,))
     print(form_df.to_string(index=False))
     print()
     
     # Field boundaries
     print(f"Field boundaries for farmer {farmer_id}:")
-    field_query = "SELECT * FROM field_boundaries WHERE farmer_id = ?"
-    field_df = pd.read_sql_query(field_query, conn, params=(farmer_id,))
     print(field_df.to_string(index=False))
-    
-    conn.close()
     return form_df, field_df
 
 def execute_custom_query(query):
     """Execute a custom SQL query"""
-    conn = sqlite3.connect('agricultural_data.db')
+    conn = get_connection()
     
     try:
         if query.strip().upper().startswith('SELECT'):
@@ -103,32 +120,33 @@ def execute_custom_query(query):
         else:
             cursor = conn.cursor()
             cursor.execute(query)
-            conn.commit()
+            clear_query_cache()
             print(f"Query executed successfully. Rows affected: {cursor.rowcount}")
     except Exception as e:
         print(f"Error executing query: {e}")
-    finally:
-        conn.close()
 
 def delete_record(table, record_id):
     """Delete a record by ID"""
-    conn = sqlite3.connect('agricultural_data.db')
+    conn = get_connection()
     cursor = conn.cursor()
     
     try:
-        cursor.execute(f"DELETE FROM {table} WHERE id = ?", (record_id,))
-        conn.commit()
+        if table not in _DELETE_SQL:
+            raise ValueError(f"Unknown table '{table}', expected one of {list(_DELETE_SQL)}")
+        cursor.execute(_DELETE_SQL[table], (record_id,))
+        clear_query_cache()
         print(f"Deleted record {record_id} from {table} table. Rows affected: {cursor.rowcount}")
     except Exception as e:
         print(f"Error deleting record: {e}")
-    finally:
-        conn.close()
 
 def backup_database():
     """Create a backup of the database"""
-    import shutil
     backup_name = f"agricultural_data_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-    shutil.copy2('agricultural_data.db', backup_name)
+    # Use the backup API rather than copying the file: in WAL mode recent
+    # commits may still live in the -wal file
+    backup_conn = sqlite3.connect(backup_name)
+    get_connection().backup(backup_conn)
+    backup_conn.close()
     print(f"Database backed up to: {backup_name}")
     return backup_name
 
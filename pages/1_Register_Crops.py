@@ -1,10 +1,23 @@
 import streamlit as st
-import sqlite3
+import math
+import numpy as np
 import folium
+from folium import plugins
 from streamlit_folium import st_folium
+import streamlit.components.v1 as components
 import json
 from datetime import datetime
 from utils.validators import validate_form_data
+from database.db_setup import encode_coordinates, ensure_initialized, transaction
+
+# orjson encodes the nested form dict several times faster than the stdlib
+try:
+    import orjson
+
+    def json_dumps(obj):
+        return orjson.dumps(obj).decode()
+except ImportError:
+    json_dumps = json.dumps
 
 
 
@@ -15,18 +28,42 @@ k = lambda name: f"{PAGE_PREFIX}:{name}"
 
 def cleanup_foreign_keys(current_page):
     """Remove session state keys from other pages to prevent UI bleeding"""
-    keys_to_delete = []
-    for key in st.session_state.keys():
-        if isinstance(key, str) and ":" in key:
-            if not key.startswith(f"{current_page}:"):
-                keys_to_delete.append(key)
-    
-    for key in keys_to_delete:
+    prefix = f"{current_page}:"
+    # Snapshot the keys first since entries are deleted while walking them
+    for key in [key for key in list(st.session_state.keys())
+                if type(key) is str and ":" in key and not key.startswith(prefix)]:
+        del st.session_state[key]
+
+def prune_crop_state(selected_crops):
+    """Drop state (map view, drawings, widgets) left by crops that aren't selected"""
+    stale_prefixes = tuple(
+        prefix
+        for crop in CROP_OPTIONS if crop not in selected_crops
+        for prefix in (k(f"{crop.lower()}_"), k(f"map_{crop.lower()}"),
+                       k(f"map_center_{crop.lower()}"), k(f"map_zoom_{crop.lower()}"),
+                       k(f"show_map_{crop.lower()}"), k(f"boundaries_{crop.lower()}"),
+                       k(f"drawings_{crop.lower()}")))
+    for key in [key for key in list(st.session_state.keys())
+                if type(key) is str and key.startswith(stale_prefixes)]:
         del st.session_state[key]
 
+def drop_deselected_boundaries(selected_crops):
+    """Forget the fields drawn for crops that have been deselected"""
+    # Streamlit drops a hidden crop's toggle and map widget state, so if its
+    # fields stayed they'd come back behind a locked, switched-off toggle:
+    # impossible to see or edit, yet still submitted
+    for crop in CROP_OPTIONS:
+        if crop not in selected_crops:
+            st.session_state.pop(k(f"boundaries_{crop.lower()}"), None)
+            st.session_state.pop(k(f"drawings_{crop.lower()}"), None)
+
 # Clean up state from other pages
 cleanup_foreign_keys(PAGE_PREFIX)
 
+# The page can be opened directly, without Instructions.py having run; make
+# sure the tables, indexes and WAL mode exist (once per server process)
+ensure_initialized()
+
 st.title("Register Crops 🌾")
 st.markdown(
     "Complete agricultural registration for your crops. Select crops below to enter production data and draw field boundaries."
@@ -37,68 +74,267 @@ if k('form_submitted') not in st.session_state:
     st.session_state[k('form_submitted')] = False
 
 
-def save_form_data(data):
-    """Save form data to database"""
-    try:
-        conn = sqlite3.connect('agricultural_data.db')
-        cursor = conn.cursor()
-
-        # Convert data to JSON string for flexible storage
-        crops_str = ", ".join(
-            data['selected_crops']) if data.get('selected_crops') else "None"
-        cursor.execute(
-            '''
-            INSERT INTO form_responses 
-            (farmer_id, district, village, season_year, crop_type, form_data, submission_date)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''',
-            (data['farmer_id'], data['district'],
-             data['village'], data['season_year'], crops_str, json.dumps(data),
-             datetime.now().isoformat()))
-
-        conn.commit()
-        conn.close()
-        return True
-    except Exception as e:
-        st.error(f"Error saving production data: {str(e)}")
-        return False
+# Fixed statement text, so the shared connection's statement cache keeps both
+# compiled across submits and reruns
+SQL_INSERT_FORM = '''
+    INSERT INTO form_responses
+    (farmer_id, district, village, season_year, crop_type, form_data, submission_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+SQL_INSERT_BOUNDARY = '''
+    INSERT INTO field_boundaries
+    (farmer_id, field_name, field_type, crop_type, coordinates, area_estimate, notes, creation_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
 
+def save_submission(data, boundary_rows, submitted_at):
+    """Save production data and all of its field boundaries in one transaction
 
-def save_field_boundary(field_data):
-    """Save field boundary data to database"""
+    submitted_at is the ISO timestamp shared by the form response and the
+    boundary rows (which already carry it as their creation_date).
+    """
     try:
-        conn = sqlite3.connect('agricultural_data.db')
-        cursor = conn.cursor()
-
-        cursor.execute(
-            '''
-            INSERT INTO field_boundaries 
-            (farmer_id, field_name, field_type, crop_type, coordinates, area_estimate, notes, creation_date)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (field_data['farmer_id'], field_data['field_name'],
-              field_data['field_type'], field_data['crop_type'],
-              json.dumps(
-                  field_data['coordinates']), field_data['area_estimate'],
-              field_data['notes'], datetime.now().isoformat()))
-
-        conn.commit()
-        conn.close()
+        # A single commit for the whole submission instead of one per row, on
+        # the shared WAL connection; nothing is kept if any insert fails
+        with transaction() as conn:
+            cursor = conn.cursor()
+
+            # Convert data to JSON string for flexible storage
+            crops_str = ", ".join(
+                data['selected_crops']) if data.get('selected_crops') else "None"
+            cursor.execute(
+                SQL_INSERT_FORM,
+                (data['farmer_id'], data['district'],
+                 data['village'], data['season_year'], crops_str, json_dumps(data),
+                 submitted_at))
+
+            cursor.executemany(SQL_INSERT_BOUNDARY, boundary_rows)
         return True
     except Exception as e:
-        st.error(f"Error saving field boundary: {str(e)}")
+        st.error(f"Error saving submission: {str(e)}")
         return False
 
 
-# Define crop options and field structures
-CROP_OPTIONS = ["Coconut", "Cocoa", "Breadfruit", "Banana", "Kava", "Other"]
-UNITS = ["Kg", "Tonnes", "Each", "Pile", "Basket", "Packet", "Bundle"]
-GROWTH_MODES = ["Single crop", "Mixed crop", "Both single & mixed"]
-PLANTING_SOURCES = [
+# Define crop options and field structures. Tuples, built once at import:
+# the selectbox option lists below are not rebuilt on every rerun.
+CROP_OPTIONS = ("Coconut", "Cocoa", "Breadfruit", "Banana", "Kava", "Other")
+UNITS = ("Kg", "Tonnes", "Each", "Pile", "Basket", "Packet", "Bundle")
+GROWTH_MODES = ("Single crop", "Mixed crop", "Both single & mixed")
+PLANTING_SOURCES = (
     "Own saved seed/seedlings", "Another household", "Market/shop",
     "Govt/extension", "NGO/project", "Company/association", "Other (specify)"
-]
-BANANA_TYPES = ["Fa'i palagi", "Fa'i Samoa", "Other (specify)"]
-FIELD_TYPES = ["Cropland", "Pasture", "Orchard", "Fallow Land", "Other"]
+)
+BANANA_TYPES = ("Fa'i palagi", "Fa'i Samoa", "Other (specify)")
+FIELD_TYPES = ("Cropland", "Pasture", "Orchard", "Fallow Land", "Other")
+DISTRICTS = (
+    "Vaimauga 1", "Vaimauga 2", "Vaimauga 3", "Vaimauga 4",
+    "Faleata 1", "Faleata 2", "Faleata 3", "Faleata 4", "Sagaga 1",
+    "Sagaga 2", "Sagaga 3", "Sagaga 4", "A'ana Alofi 1", "A'ana Alofi 2",
+    "A'ana Alofi 3", "A'ana Alofi 4"
+)
+
+# Selectbox choices with the "Select..." placeholder first
+DISTRICT_CHOICES = ("Select...",) + DISTRICTS
+UNIT_CHOICES = ("Select...",) + UNITS
+GROWTH_MODE_CHOICES = ("Select...",) + GROWTH_MODES
+BANANA_TYPE_CHOICES = ("Select...",) + BANANA_TYPES
+
+# Crop-specific questions as (left column, right column) lists. Each entry is
+# (crop_data field, widget, label, widget kwargs, key suffix); the widget key is
+# "<crop>_<suffix>". A plain string is written as a subheading.
+YES_NO = {"options": ("Yes", "No")}
+COUNT = {"min_value": 0, "step": 1}
+ACRES = {"min_value": 0.0, "step": 0.01}
+SOURCES = {"options": PLANTING_SOURCES}
+TREES_BY_AGE = "**Trees by age group:**"
+
+CROP_FIELDS = {
+    "Coconut": (
+        [("growth_mode", st.selectbox, "How is Coconut grown? *",
+          {"options": GROWTH_MODE_CHOICES}, "growth_mode"),
+         ("pest_rhino_beetle", st.radio,
+          "Affected by rhinoceros beetle (last 12 months)?", YES_NO, "beetle"),
+         ("planted_last_12m", st.radio, "Planted coconut (last 12 months)?",
+          YES_NO, "planted"),
+         ("trees_harvested", st.number_input, "Trees harvested (last 12 months)",
+          COUNT, "trees_harvested")],
+        [("planting_sources", st.multiselect, "Source(s) of planting material",
+          SOURCES, "sources"),
+         TREES_BY_AGE,
+         ("age_0_5", st.number_input, "0–5 years (count)", COUNT, "age_0_5"),
+         ("age_6_10", st.number_input, "6–10 years (count)", COUNT, "age_6_10"),
+         ("age_11_20", st.number_input, "11–20 years (count)", COUNT, "age_11_20"),
+         ("age_21_30", st.number_input, "21–30 years (count)", COUNT, "age_21_30"),
+         ("age_31_plus", st.number_input, "31+ years (count)", COUNT, "age_31_plus")],
+    ),
+    "Cocoa": (
+        [("growth_mode", st.selectbox, "How is Cocoa grown? *",
+          {"options": GROWTH_MODE_CHOICES}, "growth_mode"),
+         ("disease_mosaic", st.radio, "Cocoa mosaic disease (last 12 months)?",
+          YES_NO, "disease"),
+         ("planted_last_12m", st.radio, "Planted cocoa (last 12 months)?",
+          YES_NO, "planted")],
+        [("planting_sources", st.multiselect, "Source(s) of planting material",
+          SOURCES, "sources"),
+         TREES_BY_AGE,
+         ("age_0_2", st.number_input, "0–2 years (count)", COUNT, "age_0_2"),
+         ("age_3_5", st.number_input, "3–5 years (count)", COUNT, "age_3_5"),
+         ("age_6_10", st.number_input, "6–10 years (count)", COUNT, "age_6_10"),
+         ("age_11_20", st.number_input, "11–20 years (count)", COUNT, "age_11_20"),
+         ("age_21_30", st.number_input, "21–30 years (count)", COUNT, "age_21_30"),
+         ("age_31_plus", st.number_input, "31+ years (count)", COUNT, "age_31_plus")],
+    ),
+    "Breadfruit": (
+        [("growth_mode", st.selectbox, "How is Breadfruit grown? *",
+          {"options": GROWTH_MODE_CHOICES}, "growth_mode"),
+         ("trees_single_crop", st.number_input, "Breadfruit trees (single crop)",
+          COUNT, "trees_single"),
+         ("planted_last_12m", st.radio, "Planted breadfruit (last 12 months)?",
+          YES_NO, "planted")],
+        [("trees_harvested", st.number_input, "Trees harvested (last 12 months)",
+          COUNT, "trees_harvested"),
+         ("planting_sources", st.multiselect, "Source(s) of planting material",
+          SOURCES, "sources"),
+         ("area_acres", st.number_input, "Area planted (acres)", ACRES, "area")],
+    ),
+    "Banana": (
+        [("banana_type", st.selectbox, "Banana type *",
+          {"options": BANANA_TYPE_CHOICES}, "type"),
+         ("growth_mode", st.selectbox, "How is Banana grown? *",
+          {"options": GROWTH_MODE_CHOICES}, "growth_mode"),
+         ("plants_single_crop", st.number_input,
+          "Banana plants/suckers (single crop)", COUNT, "plants")],
+        [("area_acres", st.number_input, "Area planted (acres)", ACRES, "area")],
+    ),
+    "Kava": (
+        [("planted_last_12m", st.radio, "Planted kava (last 12 months)?",
+          YES_NO, "planted"),
+         ("plants_harvested", st.number_input, "Plants harvested (last 12 months)",
+          COUNT, "plants_harvested")],
+        [("planting_sources", st.multiselect, "Source(s) of planting material",
+          SOURCES, "sources")],
+    ),
+    "Other": (
+        [("other_crop_name", st.text_input, "Crop name *",
+          {"placeholder": "e.g., Mango, Citrus..."}, "crop_name"),
+         ("plants_growing", st.number_input, "Plants growing (count)",
+          COUNT, "plants_growing")],
+        [("plants_harvested", st.number_input, "Plants harvested (last 12 months)",
+          COUNT, "plants_harvested")],
+    ),
+}
+
+# 1 degree of latitude ≈ 111 km
+METERS_PER_DEGREE_LAT = 111000.0
+
+
+def calculate_polygon_area_hectares(coords):
+    """Calculate polygon area in hectares using shoelace formula with lat/lng conversion"""
+    n = len(coords)
+    if n < 3:
+        return 0
+
+    # Column-major (one contiguous array per axis) rather than strided views
+    # into an (n, 2) array, so the dot products below run over packed memory
+    lng = np.fromiter((coord[0] for coord in coords), dtype=np.float64, count=n)
+    lat = np.fromiter((coord[1] for coord in coords), dtype=np.float64, count=n)
+
+    # Shoelace formula for area in square degrees, vectorized
+    area_sq_degrees = 0.5 * abs(
+        np.dot(lng, np.roll(lat, -1)) - np.dot(lat, np.roll(lng, -1)))
+
+    # Convert to hectares (approximate for Samoa latitude ~-13.9°)
+    # 1 degree lng ≈ 111 km * cos(lat)
+    meters_per_degree_lng = METERS_PER_DEGREE_LAT * math.cos(
+        math.radians(lat.mean()))  # meters per degree longitude
+
+    # Convert square degrees to square meters
+    area_sq_meters = area_sq_degrees * METERS_PER_DEGREE_LAT * meters_per_degree_lng
+
+    # Convert to hectares (1 hectare = 10,000 m²)
+    return float(area_sq_meters / 10000)
+
+
+def boundaries_from_drawings(crop_type, drawings):
+    """Boundary records, with areas, for the polygons drawn on a crop's map"""
+    polygons = [
+        drawing for drawing in drawings
+        if drawing['geometry']['type'] == 'Polygon'
+    ]
+
+    boundary_data = []
+    for i, polygon in enumerate(polygons):
+        # Leaflet reports ~13 decimals; 6 (~10 cm) is plenty for a field
+        coordinates = [[round(lng, 6), round(lat, 6)]
+                       for lng, lat in polygon['geometry']['coordinates'][0]]
+
+        # Store boundary data for this polygon
+        boundary_data.append({
+            'field_name': f"{crop_type} Field {i+1}",
+            'field_type': "Cropland",
+            'coordinates': coordinates,
+            'area_estimate': calculate_polygon_area_hectares(coordinates),
+            'notes': ""
+        })
+    return boundary_data
+
+
+@st.cache_resource(show_spinner=False)
+def build_map(center_lat, center_lng, zoom, drawing=True):
+    """Base map with satellite/street layers and, optionally, polygon drawing tools
+
+    Cached so reruns reuse the map instead of rebuilding its layers and plugins.
+    """
+    # Create the base map with satellite imagery
+    m = folium.Map(location=[center_lat, center_lng],
+                   zoom_start=zoom,
+                   tiles=None)
+
+    # Add satellite tile layer
+    folium.TileLayer(
+        tiles=
+        'https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
+        attr='Esri',
+        name='Satellite',
+        overlay=False,
+        control=True).add_to(m)
+
+    # Add OpenStreetMap layer as backup
+    folium.TileLayer(tiles='OpenStreetMap',
+                     name='Street Map',
+                     overlay=False,
+                     control=True).add_to(m)
+
+    # Add drawing tools
+    if drawing:
+        draw = plugins.Draw(
+            export=True,
+            draw_options={
+                'polyline': False,
+                'polygon': True,
+                'circle': False,
+                'rectangle': False,
+                'marker': False,
+                'circlemarker': False,
+            },
+            edit_options={'poly': {
+                'allowIntersection': False
+            }})
+        draw.add_to(m)
+
+    # Add layer control
+    folium.LayerControl().add_to(m)
+
+    return m
+
+
+@st.cache_resource(show_spinner=False)
+def map_preview_html(center_lat, center_lng, zoom):
+    """Rendered HTML of the base map without drawing tools, for display only"""
+    return build_map(center_lat, center_lng, zoom, drawing=False)._repr_html_()
+
 
 # Identification Information (outside form for immediate response)
 st.subheader("Identification")
@@ -109,12 +345,7 @@ with col1:
     farmer_id = st.text_input("1. Farmer ID *",
                               placeholder="EA10208-HH0012",
                               key=k("farmer_id"))
-    district = st.selectbox("2. District *", [
-        "Select...", "Vaimauga 1", "Vaimauga 2", "Vaimauga 3", "Vaimauga 4",
-        "Faleata 1", "Faleata 2", "Faleata 3", "Faleata 4", "Sagaga 1",
-        "Sagaga 2", "Sagaga 3", "Sagaga 4", "A'ana Alofi 1", "A'ana Alofi 2",
-        "A'ana Alofi 3", "A'ana Alofi 4"
-    ],
+    district = st.selectbox("2. District *", DISTRICT_CHOICES,
                             key=k("district"))
 
 with col2:
@@ -148,352 +379,80 @@ with col3:
     if st.checkbox("Other", key=k("crop_other")):
         selected_crops.append("Other")
 
+drop_deselected_boundaries(selected_crops)
+
 # Store all crop data and boundary data
 all_crop_data = {}
 all_boundary_data = {}
 
 # Dynamic crop-specific fields for each selected crop (immediate display)
+submitted = False
 if selected_crops:
+    # Field boundary maps stay outside the form below: drawing needs live reruns
     for crop_type in selected_crops:
-        st.subheader(f"{crop_type} Production and Field Registration")
-
-        # Initialize crop data for this specific crop
-        crop_data = {}
-
-        if crop_type == "Coconut":
-            col1, col2 = st.columns(2)
-            with col1:
-                crop_data['growth_mode'] = st.selectbox(
-                    f"How is Coconut grown? *", ["Select..."] + GROWTH_MODES,
-                    key=k("coconut_growth_mode"))
-                crop_data['pest_rhino_beetle'] = st.radio(
-                    "Affected by rhinoceros beetle (last 12 months)?",
-                    ["Yes", "No"],
-                    key=k("coconut_beetle"))
-                crop_data['planted_last_12m'] = st.radio(
-                    "Planted coconut (last 12 months)?", ["Yes", "No"],
-                    key=k("coconut_planted"))
-                crop_data['trees_harvested'] = st.number_input(
-                    "Trees harvested (last 12 months)",
-                    min_value=0,
-                    step=1,
-                    key=k("coconut_trees_harvested"))
-            with col2:
-                crop_data['planting_sources'] = st.multiselect(
-                    "Source(s) of planting material",
-                    PLANTING_SOURCES,
-                    key=k("coconut_sources"))
-                st.write("**Trees by age group:**")
-                crop_data['age_0_5'] = st.number_input("0–5 years (count)",
-                                                       min_value=0,
-                                                       step=1,
-                                                       key=k("coconut_age_0_5"))
-                crop_data['age_6_10'] = st.number_input(
-                    "6–10 years (count)",
-                    min_value=0,
-                    step=1,
-                    key=k("coconut_age_6_10"))
-                crop_data['age_11_20'] = st.number_input(
-                    "11–20 years (count)",
-                    min_value=0,
-                    step=1,
-                    key=k("coconut_age_11_20"))
-                crop_data['age_21_30'] = st.number_input(
-                    "21–30 years (count)",
-                    min_value=0,
-                    step=1,
-                    key=k("coconut_age_21_30"))
-                crop_data['age_31_plus'] = st.number_input(
-                    "31+ years (count)",
-                    min_value=0,
-                    step=1,
-                    key=k("coconut_age_31_plus"))
-
-        elif crop_type == "Cocoa":
-            col1, col2 = st.columns(2)
-            with col1:
-                crop_data['growth_mode'] = st.selectbox(
-                    "How is Cocoa grown? *", ["Select..."] + GROWTH_MODES,
-                    key=k("cocoa_growth_mode"))
-                crop_data['disease_mosaic'] = st.radio(
-                    "Cocoa mosaic disease (last 12 months)?", ["Yes", "No"],
-                    key=k("cocoa_disease"))
-                crop_data['planted_last_12m'] = st.radio(
-                    "Planted cocoa (last 12 months)?", ["Yes", "No"],
-                    key=k("cocoa_planted"))
-            with col2:
-                crop_data['planting_sources'] = st.multiselect(
-                    "Source(s) of planting material",
-                    PLANTING_SOURCES,
-                    key=k("cocoa_sources"))
-                st.write("**Trees by age group:**")
-                crop_data['age_0_2'] = st.number_input("0–2 years (count)",
-                                                       min_value=0,
-                                                       step=1,
-                                                       key=k("cocoa_age_0_2"))
-                crop_data['age_3_5'] = st.number_input("3–5 years (count)",
-                                                       min_value=0,
-                                                       step=1,
-                                                       key=k("cocoa_age_3_5"))
-                crop_data['age_6_10'] = st.number_input("6–10 years (count)",
-                                                        min_value=0,
-                                                        step=1,
-                                                        key=k("cocoa_age_6_10"))
-                crop_data['age_11_20'] = st.number_input(
-                    "11–20 years (count)",
-                    min_value=0,
-                    step=1,
-                    key=k("cocoa_age_11_20"))
-                crop_data['age_21_30'] = st.number_input(
-                    "21–30 years (count)",
-                    min_value=0,
-                    step=1,
-                    key=k("cocoa_age_21_30"))
-                crop_data['age_31_plus'] = st.number_input(
-                    "31+ years (count)",
-                    min_value=0,
-                    step=1,
-                    key=k("cocoa_age_31_plus"))
-
-        elif crop_type == "Breadfruit":
-            col1, col2 = st.columns(2)
-            with col1:
-                crop_data['growth_mode'] = st.selectbox(
-                    "How is Breadfruit grown? *", ["Select..."] + GROWTH_MODES,
-                    key=k("breadfruit_growth_mode"))
-                crop_data['trees_single_crop'] = st.number_input(
-                    "Breadfruit trees (single crop)",
-                    min_value=0,
-                    step=1,
-                    key=k("breadfruit_trees_single"))
-                crop_data['planted_last_12m'] = st.radio(
-                    "Planted breadfruit (last 12 months)?", ["Yes", "No"],
-                    key=k("breadfruit_planted"))
-            with col2:
-                crop_data['trees_harvested'] = st.number_input(
-                    "Trees harvested (last 12 months)",
-                    min_value=0,
-                    step=1,
-                    key=k("breadfruit_trees_harvested"))
-                crop_data['planting_sources'] = st.multiselect(
-                    "Source(s) of planting material",
-                    PLANTING_SOURCES,
-                    key=k("breadfruit_sources"))
-                crop_data['area_acres'] = st.number_input(
-                    "Area planted (acres)",
-                    min_value=0.0,
-                    step=0.01,
-                    key=k("breadfruit_area"))
-
-        elif crop_type == "Banana":
-            col1, col2 = st.columns(2)
-            with col1:
-                crop_data['banana_type'] = st.selectbox(
-                    "Banana type *", ["Select..."] + BANANA_TYPES,
-                    key=k("banana_type"))
-                crop_data['growth_mode'] = st.selectbox(
-                    "How is Banana grown? *", ["Select..."] + GROWTH_MODES,
-                    key=k("banana_growth_mode"))
-                crop_data['plants_single_crop'] = st.number_input(
-                    "Banana plants/suckers (single crop)",
-                    min_value=0,
-                    step=1,
-                    key=k("banana_plants"))
-            with col2:
-                crop_data['area_acres'] = st.number_input(
-                    "Area planted (acres)",
-                    min_value=0.0,
-                    step=0.01,
-                    key=k("banana_area"))
-
-        elif crop_type == "Kava":
-            col1, col2 = st.columns(2)
-            with col1:
-                crop_data['planted_last_12m'] = st.radio(
-                    "Planted kava (last 12 months)?", ["Yes", "No"],
-                    key=k("kava_planted"))
-                crop_data['plants_harvested'] = st.number_input(
-                    "Plants harvested (last 12 months)",
-                    min_value=0,
-                    step=1,
-                    key=k("kava_plants_harvested"))
-            with col2:
-                crop_data['planting_sources'] = st.multiselect(
-                    "Source(s) of planting material",
-                    PLANTING_SOURCES,
-                    key=k("kava_sources"))
-
-        elif crop_type == "Other":
-            col1, col2 = st.columns(2)
-            with col1:
-                crop_data['other_crop_name'] = st.text_input(
-                    "Crop name *",
-                    placeholder="e.g., Mango, Citrus...",
-                    key=k("other_crop_name"))
-                crop_data['plants_growing'] = st.number_input(
-                    "Plants growing (count)",
-                    min_value=0,
-                    step=1,
-                    key=k("other_plants_growing"))
-            with col2:
-                crop_data['plants_harvested'] = st.number_input(
-                    "Plants harvested (last 12 months)",
-                    min_value=0,
-                    step=1,
-                    key=k("other_plants_harvested"))
-
-        # Production fields for each crop
-        st.write("**Production Information:**")
-        col1, col2 = st.columns(2)
-        with col1:
-            crop_data['qty_harvested'] = st.number_input(
-                "Quantity harvested (last 12 months) *",
-                min_value=0.0,
-                step=0.1,
-                key=k(f"{crop_type.lower().replace(' ', '_')}_qty"))
-            crop_data['unit'] = st.selectbox(
-                "Unit of measure *", ["Select..."] + UNITS,
-                key=k(f"{crop_type.lower().replace(' ', '_')}_unit"))
-        with col2:
-            crop_data['price_per_unit'] = st.number_input(
-                "Average price per unit (last 12 months)",
-                min_value=0.0,
-                step=0.01,
-                key=k(f"{crop_type.lower().replace(' ', '_')}_price"))
-
-        # Store this crop's data
-        all_crop_data[crop_type] = crop_data
-
-        # Field boundary mapping section
-        st.write(f"**Draw the boundaries of your {crop_type} fields**")
-        st.info(
-            "**Instructions:** Use the drawing tools on the map to draw a shape around each of your field boundaries for the given crop type. Click on the ⬟ icon in the toolbar to start drawing."
-        )
+        # Widget/state key fragment for this crop, built once per crop
+        ct_slug = crop_type.lower().replace(' ', '_')
+        st.subheader(f"{crop_type} Field Registration")
 
         # Initialize the map for this crop
-        map_key = f"map_center_{crop_type.lower()}"
+        map_key = k(f"map_center_{ct_slug}")
+        zoom_key = k(f"map_zoom_{ct_slug}")
         if map_key not in st.session_state:
             # Default to Upolu Island, Samoa - agricultural AOI
             st.session_state[map_key] = [-13.9167, -171.7500]
-            st.session_state[f"map_zoom_{crop_type.lower()}"] = 12
-
-        # Create the base map with satellite imagery
-        m = folium.Map(
-            location=st.session_state[map_key],
-            zoom_start=st.session_state[f"map_zoom_{crop_type.lower()}"],
-            tiles=None)
-
-        # Add satellite tile layer
-        folium.TileLayer(
-            tiles=
-            'https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
-            attr='Esri',
-            name='Satellite',
-            overlay=False,
-            control=True).add_to(m)
-
-        # Add OpenStreetMap layer as backup
-        folium.TileLayer(tiles='OpenStreetMap',
-                         name='Street Map',
-                         overlay=False,
-                         control=True).add_to(m)
-
-        # Add drawing tools
-        from folium import plugins
-        draw = plugins.Draw(
-            export=True,
-            draw_options={
-                'polyline': False,
-                'polygon': True,
-                'circle': False,
-                'rectangle': False,
-                'marker': False,
-                'circlemarker': False,
-            },
-            edit_options={'poly': {
-                'allowIntersection': False
-            }})
-        draw.add_to(m)
+            st.session_state[zoom_key] = 12
+
+        # Only maps the user is drawing on go through st_folium, which sends
+        # the drawings back (and reruns the page) on every interaction. Once a
+        # field is drawn the map can't be hidden again: st_folium would remount
+        # it empty, and the next drawing there would replace the stored fields.
+        boundaries_key = k(f"boundaries_{ct_slug}")
+        if st.toggle(f"Draw {crop_type} fields",
+                     key=k(f"show_map_{ct_slug}"),
+                     disabled=bool(st.session_state.get(boundaries_key))):
+            # Field boundary mapping section
+            st.write(f"**Draw the boundaries of your {crop_type} fields**")
+            st.info(
+                "**Instructions:** Use the drawing tools on the map to draw a shape around each of your field boundaries for the given crop type. Click on the ⬟ icon in the toolbar to start drawing."
+            )
 
-        # Add layer control
-        folium.LayerControl().add_to(m)
-
-        # Display the map
-        map_data = st_folium(m,
-                             width=None,
-                             height=500,
-                             returned_objects=["all_drawings"],
-                             key=k(f"map_{crop_type.lower()}"))
-
-        # Process drawn polygons
-        boundary_data = []
-        total_area_hectares = 0
-        num_fields = 0
-
-        if map_data['all_drawings'] and len(map_data['all_drawings']) > 0:
-            # Process all polygons for this crop
-            polygons = [
-                drawing for drawing in map_data['all_drawings']
-                if drawing['geometry']['type'] == 'Polygon'
-            ]
-            num_fields = len(polygons)
-
-            if num_fields > 0:
-
-                # Calculate area for each polygon
-                def calculate_polygon_area_hectares(coords):
-                    """Calculate polygon area in hectares using shoelace formula with lat/lng conversion"""
-                    n = len(coords)
-                    if n < 3:
-                        return 0
-
-                    # Shoelace formula for area in square degrees
-                    area_sq_degrees = 0
-                    for i in range(n):
-                        j = (i + 1) % n
-                        area_sq_degrees += coords[i][0] * coords[j][1]
-                        area_sq_degrees -= coords[j][0] * coords[i][1]
-                    area_sq_degrees = abs(area_sq_degrees) / 2
-
-                    # Convert to hectares (approximate for Samoa latitude ~-13.9°)
-                    # 1 degree lat ≈ 111 km, 1 degree lng ≈ 111 km * cos(lat)
-                    lat_avg = sum(coord[1] for coord in coords) / len(coords)
-                    import math
-                    meters_per_degree_lat = 111000  # meters per degree latitude
-                    meters_per_degree_lng = 111000 * math.cos(
-                        math.radians(lat_avg))  # meters per degree longitude
-
-                    # Convert square degrees to square meters
-                    area_sq_meters = area_sq_degrees * meters_per_degree_lat * meters_per_degree_lng
-
-                    # Convert to hectares (1 hectare = 10,000 m²)
-                    area_hectares = area_sq_meters / 10000
-                    return area_hectares
-
-                # Process each polygon
-                for i, polygon in enumerate(polygons):
-                    coordinates = polygon['geometry']['coordinates'][0]
-                    area_ha = calculate_polygon_area_hectares(coordinates)
-                    total_area_hectares += area_ha
-
-                    # Store boundary data for this polygon
-                    boundary_data.append({
-                        'field_name': f"{crop_type} Field {i+1}",
-                        'field_type': "Cropland",
-                        'coordinates': coordinates,
-                        'area_estimate': area_ha,
-                        'notes': ""
-                    })
-
-                # Display summary metrics
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.metric(f"Number of {crop_type} fields", num_fields)
-                with col2:
-                    st.metric("Total area (ha)", f"{total_area_hectares:.2f}")
-
-                # Store all boundary data for this crop
-                all_boundary_data[crop_type] = boundary_data
+            # Build (or reuse) the base map
+            m = build_map(*st.session_state[map_key], st.session_state[zoom_key])
+
+            # Display the map
+            map_data = st_folium(m,
+                                 width=None,
+                                 height=500,
+                                 returned_objects=["all_drawings"],
+                                 key=k(f"map_{ct_slug}"))
+
+            # all_drawings stays None until something is drawn on this map.
+            # st_folium returns the same drawings on every rerun, so only
+            # re-derive the boundaries (rounding, areas) when they changed.
+            drawings = map_data['all_drawings']
+            drawings_key = k(f"drawings_{ct_slug}")
+            if drawings is not None and drawings != st.session_state.get(drawings_key):
+                st.session_state[drawings_key] = drawings
+                st.session_state[boundaries_key] = boundaries_from_drawings(
+                    crop_type, drawings)
+        else:
+            # Static preview: pans and zooms stay in the browser, no readback
+            components.html(
+                map_preview_html(*st.session_state[map_key], st.session_state[zoom_key]),
+                height=500)
+
+        boundary_data = st.session_state.get(boundaries_key, [])
+        if boundary_data:
+            # Display summary metrics
+            total_area_hectares = sum(b['area_estimate'] for b in boundary_data)
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric(f"Number of {crop_type} fields", len(boundary_data))
+            with col2:
+                st.metric("Total area (ha)", f"{total_area_hectares:.2f}")
+
+            # Store all boundary data for this crop
+            all_boundary_data[crop_type] = boundary_data
         else:
             st.info(
                 "Draw a polygon on the map to define field boundaries for this crop."
@@ -501,14 +460,51 @@ if selected_crops:
 
         st.divider()  # Visual separator between crops
 
-# Submit button (only show if crops are selected)
-if selected_crops:
-    if st.button("Submit Production Data & Field Boundaries", type="primary"):
-        submitted = True
-    else:
-        submitted = False
-else:
-    submitted = False
+    # Production questions for all crops are batched in one form, so editing
+    # them doesn't rerun the page (and every map) until it is submitted
+    with st.form(k("production_form"), clear_on_submit=False):
+        for crop_type in selected_crops:
+            ct_slug = crop_type.lower().replace(' ', '_')
+            st.subheader(f"{crop_type} Production")
+
+            # Initialize crop data for this specific crop
+            crop_data = {}
+
+            # Crop-specific questions, rendered from CROP_FIELDS
+            for column, fields in zip(st.columns(2), CROP_FIELDS[crop_type]):
+                with column:
+                    for field in fields:
+                        if isinstance(field, str):
+                            st.write(field)
+                            continue
+                        name, widget, label, kwargs, suffix = field
+                        crop_data[name] = widget(
+                            label, key=k(f"{ct_slug}_{suffix}"), **kwargs)
+
+            # Production fields for each crop
+            st.write("**Production Information:**")
+            col1, col2 = st.columns(2)
+            with col1:
+                crop_data['qty_harvested'] = st.number_input(
+                    "Quantity harvested (last 12 months) *",
+                    min_value=0.0,
+                    step=0.1,
+                    key=k(f"{ct_slug}_qty"))
+                crop_data['unit'] = st.selectbox(
+                    "Unit of measure *", UNIT_CHOICES,
+                    key=k(f"{ct_slug}_unit"))
+            with col2:
+                crop_data['price_per_unit'] = st.number_input(
+                    "Average price per unit (last 12 months)",
+                    min_value=0.0,
+                    step=0.01,
+                    key=k(f"{ct_slug}_price"))
+
+            # Store this crop's data
+            all_crop_data[crop_type] = crop_data
+
+        submitted = st.form_submit_button(
+            "Submit Production Data & Field Boundaries", type="primary")
 
 if submitted:
     # Collect form data
@@ -525,37 +521,29 @@ if submitted:
     is_valid, error_message = validate_form_data(form_data)
 
     if is_valid:
-        # Save production data
-        production_saved = save_form_data(form_data)
-
-        # Save boundary data for each crop that has it
-        boundaries_saved = []
-        total_boundaries_saved = 0
-        for crop_type, boundary_list in all_boundary_data.items():
-            if boundary_list:  # Check if list is not empty
-                crop_fields_saved = 0
-                for boundary_info in boundary_list:
-                    field_data = {
-                        'farmer_id': farmer_id,
-                        'field_name': boundary_info['field_name'],
-                        'field_type': boundary_info['field_type'],
-                        'crop_type': crop_type,
-                        'coordinates': boundary_info['coordinates'],
-                        'area_estimate': boundary_info['area_estimate'],
-                        'notes': boundary_info['notes']
-                    }
-                    if save_field_boundary(field_data):
-                        crop_fields_saved += 1
-                        total_boundaries_saved += 1
-                if crop_fields_saved > 0:
-                    boundaries_saved.append(crop_type)
-
-        if production_saved:
+        # One timestamp for the whole submission: the form response and every
+        # boundary row below
+        submitted_at = datetime.now().isoformat()
+        boundary_rows = [
+            (farmer_id, boundary_info['field_name'], boundary_info['field_type'],
+             crop_type, encode_coordinates(boundary_info['coordinates']),
+             boundary_info['area_estimate'], boundary_info['notes'], submitted_at)
+            for crop_type, boundary_list in all_boundary_data.items()
+            for boundary_info in boundary_list
+        ]
+
+        # Save production data and boundaries together
+        if save_submission(form_data, boundary_rows, submitted_at):
             st.success("✅ Data submitted successfully!")
 
             # Show balloons animation
             st.balloons()
             st.session_state[k('form_submitted')] = True
+            # Let the dashboard's cached queries pick up the new registration
+            st.cache_data.clear()
+            # Bound state growth over the tab's lifetime: crops toggled off
+            # before submitting won't be coming back for this entry
+            prune_crop_state(selected_crops)
         else:
             st.error("❌ Failed to submit production data. Please try again.")
     else:
@@ -571,12 +559,9 @@ if st.session_state[k('form_submitted')]:
     with col2:
         if st.button("Submit Another Entry"):
             # Clear all namespaced form data for fresh entry
-            keys_to_delete = []
-            for key in st.session_state.keys():
-                if isinstance(key, str) and key.startswith(f"{PAGE_PREFIX}:"):
-                    keys_to_delete.append(key)
-            
-            for key in keys_to_delete:
+            prefix = f"{PAGE_PREFIX}:"
+            for key in [key for key in list(st.session_state.keys())
+                        if type(key) is str and key.startswith(prefix)]:
                 del st.session_state[key]
 
             st.session_state[k('form_submitted')] = False
@@ -1,3 +1,4 @@
+import re
 import streamlit as st
 
 # Page configuration and widget key namespacing
@@ -8,28 +9,31 @@ def k(key_name):
     """Create a namespaced key for widgets to prevent state bleeding between pages."""
     return f"{PAGE_PREFIX}:{key_name}"
 
+# Common component state patterns that can bleed between pages, compiled into
+# one case-insensitive alternation so each key is scanned once
+FOREIGN_STATE_PATTERNS = ('folium', 'map_data', 'plotly', 'chart_', 'download_',
+                          'dataframe_', 'table_', '_selection', '_zoom', '_center')
+FOREIGN_STATE_RE = re.compile('|'.join(map(re.escape, FOREIGN_STATE_PATTERNS)),
+                              re.IGNORECASE)
+
 # Add cleanup function for any foreign state
 def cleanup_foreign_keys():
     """Remove session state keys from other pages to prevent bleeding."""
-    keys_to_remove = []
-    for key in st.session_state.keys():
-        if isinstance(key, str):
-            # Remove namespaced keys from other pages
-            if ":" in key and not key.startswith(f"{PAGE_PREFIX}:"):
-                keys_to_remove.append(key)
-            # Remove common component state patterns that can bleed (but not our own)
-            elif not key.startswith(f"{PAGE_PREFIX}:") and any(pattern in key.lower() for pattern in [
-                'folium', 'map_data', 'plotly', 'chart_', 'download_', 
-                'dataframe_', 'table_', '_selection', '_zoom', '_center'
-            ]):
-                keys_to_remove.append(key)
-    
+    prefix = f"{PAGE_PREFIX}:"
+    # Snapshot the keys first since entries are deleted while walking them
+    keys_to_remove = [
+        key for key in list(st.session_state.keys())
+        if type(key) is str and not key.startswith(prefix) and (
+            # Namespaced keys from other pages, or un-namespaced component state
+            ":" in key or FOREIGN_STATE_RE.search(key))
+    ]
     for key in keys_to_remove:
         del st.session_state[key]
 
 # Cleanup any foreign state on page load
 cleanup_foreign_keys()
-import sqlite3
+import os
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -37,6 +41,9 @@ from datetime import datetime
 import json
 import folium
 from streamlit_folium import st_folium
+from database.db_setup import (CROP_PRODUCTION_SELECT, DB_PATH, decode_coordinates,
+                               get_connection)
+from database.queries import CACHE_TTL
 
 
 
@@ -45,130 +52,339 @@ st.title("Agricultural Data Dashboard 📊")
 st.markdown("Comprehensive view of collected agricultural data and insights")
 
 
-def load_form_data():
-    """Load form response data from database"""
+def database_version():
+    """Modification times of the database file and its WAL
+
+    Every commit touches one of them, so passing this to the cached loaders
+    invalidates them as soon as the data changes, including writes made
+    outside this app (e.g. database_viewer.py).
+    """
+    return tuple(os.path.getmtime(path) if os.path.exists(path) else 0.0
+                 for path in (DB_PATH, f"{DB_PATH}-wal"))
+
+
+# Cached so widget clicks and map pans reuse the loaded frames instead of
+# re-querying; JSON is only ever picked apart inside SQLite. The version
+# argument (see database_version) is only there to key the cache.
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def load_overview(version):
+    """Form count, mapped field count and total mapped area, aggregated in SQL"""
+    # Same filter as load_field_data, so the numbers match the map and table
+    return tuple(get_connection().execute("""
+        SELECT (SELECT COUNT(*) FROM form_responses),
+               COUNT(*),
+               COALESCE(SUM(area_estimate), 0)
+        FROM field_boundaries
+        WHERE coordinates IS NOT NULL AND coordinates != ''
+    """).fetchone())
+
+
+# The preview tables only show the newest rows, so they get their own LIMITed
+# queries instead of slicing head() off a full table load
+PREVIEW_ROWS = 10
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def load_recent_forms(version, limit=PREVIEW_ROWS):
+    """Load the newest form responses (table columns only) from database"""
     try:
-        conn = sqlite3.connect('agricultural_data.db')
-        df = pd.read_sql_query(
+        return pd.read_sql_query(
             """
-            SELECT * FROM form_responses 
+            SELECT farmer_id, district, village, crop_type, season_year,
+                   submission_date
+            FROM form_responses
             ORDER BY submission_date DESC
-        """, conn)
-        conn.close()
-
-        # Parse JSON form_data if it exists
-        if not df.empty and 'form_data' in df.columns:
-            # Expand JSON data into columns
-            expanded_data = []
-            for _, row in df.iterrows():
-                try:
-                    form_json = json.loads(row['form_data'])
-                    # Combine basic fields with JSON data
-                    combined_row = {
-                        'id': row['id'],
-                        'farmer_id': row['farmer_id'],
-                        'district': row['district'],
-                        'village': row['village'],
-                        'ea_code': row['ea_code'],
-                        'season_year': row['season_year'],
-                        'crop_type': row['crop_type'],
-                        'submission_date': row['submission_date'],
-                        **form_json  # Expand all JSON fields
-                    }
-                    expanded_data.append(combined_row)
-                except json.JSONDecodeError:
-                    # If JSON parsing fails, use basic row data
-                    expanded_data.append(row.to_dict())
-
-            df = pd.DataFrame(expanded_data)
-
-        return df
+            LIMIT ?
+        """, get_connection(), params=(limit,))
     except Exception as e:
         st.error(f"Error loading form data: {str(e)}")
         return pd.DataFrame()
 
 
-def load_field_data():
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def load_recent_fields(version, limit=PREVIEW_ROWS):
+    """Load the newest mapped field boundaries, without their coordinates"""
+    try:
+        return pd.read_sql_query(
+            """
+            SELECT field_name, field_type, area_estimate, creation_date
+            FROM field_boundaries
+            WHERE coordinates IS NOT NULL AND coordinates != ''
+            ORDER BY creation_date DESC
+            LIMIT ?
+        """, get_connection(), params=(limit,))
+    except Exception as e:
+        st.error(f"Error loading field boundaries: {str(e)}")
+        return pd.DataFrame()
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def load_crop_production(version):
+    """One row per crop per form response, with its production figures"""
+    try:
+        # qty_harvested etc. live under form_data.crop_data.<crop>, so they are
+        # extracted per crop with json_each/json_extract rather than top-level
+        return pd.read_sql_query(
+            f"""
+            SELECT form_id, farmer_id, crop, qty_harvested, unit, price_per_unit
+            FROM ({CROP_PRODUCTION_SELECT})
+        """, get_connection())
+    except Exception as e:
+        st.error(f"Error loading production data: {str(e)}")
+        return pd.DataFrame()
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def load_form_export(version):
+    """Full form responses for CSV export, form_data's top-level keys as columns"""
+    df = pd.read_sql_query(
+        "SELECT * FROM form_responses ORDER BY submission_date DESC",
+        get_connection())
+    # Same layout as the export has always had: the table columns, then the
+    # parsed JSON fields. Rows whose form_data isn't a JSON object keep it raw.
+    records = []
+    for row in df.to_dict('records'):
+        try:
+            form_json = json.loads(row['form_data'])
+        except json.JSONDecodeError:
+            form_json = None
+        if isinstance(form_json, dict):
+            del row['form_data']
+            row.update(form_json)
+        records.append(row)
+    return pd.DataFrame(records)
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def load_field_data(version):
     """Load field boundary data from database"""
     try:
-        conn = sqlite3.connect('agricultural_data.db')
         df = pd.read_sql_query(
             """
             SELECT * FROM field_boundaries 
             WHERE coordinates IS NOT NULL AND coordinates != ''
             ORDER BY creation_date DESC
-        """, conn)
-        conn.close()
+        """, get_connection())
+        # Coordinates are stored as packed float64 BLOBs; expose them as
+        # [[lng, lat], ...] lists for the map and the CSV export
+        df['coordinates'] = df['coordinates'].map(decode_coordinates)
         return df
     except Exception as e:
         st.error(f"Error loading field boundaries: {str(e)}")
         return pd.DataFrame()
 
 
-# Load data
-form_df = load_form_data()
-field_df = load_field_data()
+# CSV exports, serialized once per database version rather than on every rerun;
+# keyed on the version so Streamlit doesn't have to hash the frames themselves
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def form_csv_bytes(version):
+    """Form responses export as UTF-8 CSV bytes"""
+    return load_form_export(version).to_csv(index=False).encode()
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def field_csv_bytes(version):
+    """Field boundaries export as UTF-8 CSV bytes, coordinates as JSON text"""
+    field_df = load_field_data(version)
+    return field_df.assign(
+        coordinates=field_df['coordinates'].map(json.dumps)).to_csv(index=False).encode()
+
+
+# Above this many production rows the charts stop shipping every raw point to
+# the browser: the histogram is binned here and the scatter is drawn with WebGL
+DOWNSAMPLE_THRESHOLD = 5_000
+
+
+# Define colors for field boundaries
+FIELD_COLORS = [
+    'red', 'blue', 'green', 'purple', 'orange', 'darkred', 'lightred', 'beige',
+    'darkblue', 'darkgreen', 'cadetblue', 'darkpurple', 'white', 'pink',
+    'lightblue', 'lightgreen', 'gray', 'black', 'lightgray'
+]
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def field_polygons(version):
+    """(locations, popup, tooltip, color) for every drawable field boundary"""
+    field_df = load_field_data(version)
+    if field_df.empty:
+        return []
+
+    # Fill the defaults and build the popup/tooltip text as whole columns, so
+    # the loop only picks finished values off each row
+    map_rows = field_df[['coordinates', 'field_name', 'field_type', 'crop_type',
+                         'area_estimate', 'creation_date']].fillna({
+        'field_name': 'Unknown Field',
+        'field_type': 'Unknown',
+        'crop_type': 'Unknown',
+        'area_estimate': 0,
+        'creation_date': ''
+    })
+    name = map_rows['field_name'].astype(str)
+    field_type = map_rows['field_type'].astype(str)
+    popups = ('<b>' + name + '</b><br>'
+              + 'Type: ' + field_type + '<br>'
+              + 'Crop: ' + map_rows['crop_type'].astype(str) + '<br>'
+              + 'Area: ' + map_rows['area_estimate'].astype(str) + ' acres<br>'
+              + 'Created: ' + map_rows['creation_date'].astype(str).str[:10])
+    tooltips = name + ' (' + field_type + ')'
+
+    polygons = []
+    for idx, (coordinates, popup, tooltip) in enumerate(
+            zip(map_rows['coordinates'], popups, tooltips)):
+        try:
+            # Validate coordinates structure: at least three [lng, lat] points
+            points = np.asarray(coordinates, dtype=np.float64)
+            if points.ndim != 2 or points.shape[0] < 3 or points.shape[1] < 2:
+                continue
+
+            # Convert coordinates to folium format [lat, lng] in one array op
+            folium_coords = points[:, 1::-1].tolist()
+
+            # Choose color based on field type or cycle through available colors
+            color = FIELD_COLORS[idx % len(FIELD_COLORS)]
+
+            polygons.append((folium_coords, popup, tooltip, color))
+
+        except (KeyError, TypeError, IndexError, ValueError) as e:
+            # Silently skip invalid boundaries instead of showing warnings
+            continue
+    return polygons
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def field_map(version):
+    """Satellite map with every field boundary drawn on it
+
+    Shared by all sessions and never modified after it is built, so the tile
+    layers and polygons are only constructed once per database version; only
+    the latest version is kept.
+    """
+    # Create map centered on Upolu Island, Samoa
+    map_center = [-13.9167, -171.7500]  # Upolu Island coordinates
+    m = folium.Map(location=map_center, zoom_start=12, tiles=None)
+
+    # Add satellite tile layer
+    folium.TileLayer(
+        tiles=
+        'https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
+        attr='Esri',
+        name='Satellite',
+        overlay=False,
+        control=True).add_to(m)
+
+    # Add OpenStreetMap layer as backup
+    folium.TileLayer(tiles='OpenStreetMap',
+                     name='Street Map',
+                     overlay=False,
+                     control=True).add_to(m)
+
+    # Add all field boundaries to the map
+    for folium_coords, popup, tooltip, color in field_polygons(version):
+        folium.Polygon(locations=folium_coords,
+                       popup=popup,
+                       tooltip=tooltip,
+                       color=color,
+                       weight=2,
+                       opacity=0.8,
+                       fillColor=color,
+                       fillOpacity=0.3).add_to(m)
+
+    # Add layer control
+    folium.LayerControl().add_to(m)
+    return m
+
+
+# Data is cached until the database changes or the TTL expires. The overview
+# only needs counts, so full tables are loaded by the sections that show them.
+data_version = database_version()
+form_count, field_count, total_mapped_area = load_overview(data_version)
 
 # Overview metrics
 st.subheader("Data Overview")
 col1, col2, col3, col4, col5 = st.columns(5)
 
 with col1:
-    st.metric("Form Responses", len(form_df))
+    st.metric("Form Responses", form_count)
 with col2:
-    st.metric("Field Boundaries", len(field_df))
+    st.metric("Field Boundaries", field_count)
 with col3:
-    if not field_df.empty:
-        total_mapped_area = field_df['area_estimate'].sum()
+    if field_count:
         st.metric("Total Mapped Area (ha)", f"{total_mapped_area:.1f}")
     else:
         st.metric("Total Mapped Area", "No data")
 with col4:
-    total_records = len(form_df) + len(field_df)
+    total_records = form_count + field_count
     st.metric("Total Records", total_records)
 with col5:
-    if not form_df.empty and not field_df.empty:
+    if form_count and field_count:
         st.metric("Data Status", "✅ Active")
     else:
         st.metric("Data Status", "⚠️ Limited")
 
 # Form Data Analysis
-if not form_df.empty:
+if form_count:
+    crop_df = load_crop_production(data_version)
     col1, col2 = st.columns(2)
 
     with col1:
         # Quantity harvested distribution
-        if 'qty_harvested' in form_df.columns:
-            fig2 = px.histogram(form_df,
-                                x='qty_harvested',
-                                title="Quantity Harvested Distribution",
-                                nbins=10,
-                                labels={
-                                    'qty_harvested': 'Quantity Harvested',
-                                    'count': 'Number of Records'
-                                })
+        if 'qty_harvested' in crop_df.columns:
+            if len(crop_df) > DOWNSAMPLE_THRESHOLD:
+                # Bin server-side so only the bar heights reach the browser
+                qty = pd.to_numeric(crop_df['qty_harvested'], errors='coerce').dropna()
+                counts, edges = np.histogram(qty, bins=10)
+                fig2 = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2,
+                                        y=counts,
+                                        width=np.diff(edges)))
+                fig2.update_layout(title="Quantity Harvested Distribution",
+                                   xaxis_title='Quantity Harvested',
+                                   yaxis_title='Number of Records')
+            else:
+                fig2 = px.histogram(crop_df,
+                                    x='qty_harvested',
+                                    title="Quantity Harvested Distribution",
+                                    nbins=10,
+                                    labels={
+                                        'qty_harvested': 'Quantity Harvested',
+                                        'count': 'Number of Records'
+                                    })
             st.plotly_chart(fig2, use_container_width=True, key=k("quantity_histogram_chart"))
 
     with col2:
         # Price vs Quantity relationship
-        if 'price_per_unit' in form_df.columns and 'qty_harvested' in form_df.columns:
-            fig4 = px.scatter(
-                form_df,
-                x='qty_harvested',
-                y='price_per_unit',
-                color='crop_type' if 'crop_type' in form_df.columns else None,
-                title="Price vs Quantity Harvested",
-                labels={
-                    'qty_harvested': 'Quantity Harvested',
-                    'price_per_unit': 'Price per Unit'
-                })
+        if 'price_per_unit' in crop_df.columns and 'qty_harvested' in crop_df.columns:
+            if len(crop_df) > DOWNSAMPLE_THRESHOLD:
+                # WebGL markers, one trace per crop to keep the colour legend
+                fig4 = go.Figure([
+                    go.Scattergl(x=crops['qty_harvested'],
+                                 y=crops['price_per_unit'],
+                                 mode='markers',
+                                 name=crop)
+                    for crop, crops in crop_df.groupby('crop', sort=False)
+                ])
+                fig4.update_layout(title="Price vs Quantity Harvested",
+                                   xaxis_title='Quantity Harvested',
+                                   yaxis_title='Price per Unit',
+                                   legend_title_text='crop')
+            else:
+                fig4 = px.scatter(
+                    crop_df,
+                    x='qty_harvested',
+                    y='price_per_unit',
+                    color='crop',
+                    title="Price vs Quantity Harvested",
+                    labels={
+                        'qty_harvested': 'Quantity Harvested',
+                        'price_per_unit': 'Price per Unit'
+                    })
             st.plotly_chart(fig4, use_container_width=True, key=k("price_quantity_scatter_chart"))
 
     # Recent submissions table
     st.subheader("Recent Form Submissions")
-    if len(form_df) > 0:
+    recent_forms = load_recent_forms(data_version)
+    if len(recent_forms) > 0:
         # Show last 10 submissions
-        recent_forms = form_df.head(10)
         display_cols = [
             'farmer_id', 'district', 'village', 'crop_type', 'season_year',
             'submission_date'
@@ -191,17 +407,17 @@ else:
     )
 
 # Field Data Analysis
-if not field_df.empty:
+if field_count:
+    recent_fields = load_recent_fields(data_version)
 
     # Field boundaries table
     st.subheader("Recent Field Boundaries")
     display_cols = [
         'field_name', 'field_type', 'area_estimate', 'creation_date'
     ]
-    available_cols = [col for col in display_cols if col in field_df.columns]
+    available_cols = [col for col in display_cols if col in recent_fields.columns]
 
     if available_cols:
-        recent_fields = field_df.head(10)
         st.dataframe(recent_fields[available_cols],
                      use_container_width=True,
                      hide_index=True,
@@ -215,86 +431,18 @@ else:
 # Field Boundaries Map
 st.subheader("Field Boundaries Map")
 
-# Create map centered on Upolu Island, Samoa
-map_center = [-13.9167, -171.7500]  # Upolu Island coordinates
-m = folium.Map(location=map_center, zoom_start=12, tiles=None)
-
-# Add satellite tile layer
-folium.TileLayer(
-    tiles=
-    'https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}',
-    attr='Esri',
-    name='Satellite',
-    overlay=False,
-    control=True).add_to(m)
-
-# Add OpenStreetMap layer as backup
-folium.TileLayer(tiles='OpenStreetMap',
-                 name='Street Map',
-                 overlay=False,
-                 control=True).add_to(m)
-
-# Define colors for field boundaries
-colors = [
-    'red', 'blue', 'green', 'purple', 'orange', 'darkred', 'lightred', 'beige',
-    'darkblue', 'darkgreen', 'cadetblue', 'darkpurple', 'white', 'pink',
-    'lightblue', 'lightgreen', 'gray', 'black', 'lightgray'
-]
-
-# Add all field boundaries to the map
-if not field_df.empty:
-    for idx, (_, row) in enumerate(field_df.iterrows()):
-        try:
-            # Check if coordinates exist and are not empty
-            if pd.isna(row['coordinates']) or str(
-                    row['coordinates']).strip() == '':
-                continue
-
-            coordinates = json.loads(str(row['coordinates']))
-
-            # Validate coordinates structure
-            if not coordinates or len(coordinates) < 3:
-                continue
-
-            # Convert coordinates to folium format [lat, lng]
-            folium_coords = [[coord[1], coord[0]] for coord in coordinates]
-
-            # Choose color based on field type or cycle through available colors
-            color = colors[idx % len(colors)]
-
-            # Safely get field attributes with defaults
-            field_name = row.get('field_name', 'Unknown Field')
-            field_type = row.get('field_type', 'Unknown')
-            crop_type = row.get('crop_type', 'Unknown')
-            area_estimate = row.get('area_estimate', 0)
-            creation_date = str(row.get('creation_date', ''))[:10]
-
-            # Add polygon to map
-            folium.Polygon(locations=folium_coords,
-                           popup=f"""
-                <b>{field_name}</b><br>
-                Type: {field_type}<br>
-                Crop: {crop_type}<br>
-                Area: {area_estimate} acres<br>
-                Created: {creation_date}
-                """,
-                           tooltip=f"{field_name} ({field_type})",
-                           color=color,
-                           weight=2,
-                           opacity=0.8,
-                           fillColor=color,
-                           fillOpacity=0.3).add_to(m)
-
-        except (json.JSONDecodeError, KeyError, TypeError, IndexError) as e:
-            # Silently skip invalid boundaries instead of showing warnings
-            continue
+# Map interactions only rerun this fragment, not the queries, charts and
+# exports of the whole page
+@st.fragment
+def render_field_map(version):
+    """Display the field boundaries map"""
+    # Display-only: returning nothing means panning never triggers a rerun
+    st_folium(field_map(version), width=None, height=700, returned_objects=[],
+              key=k("field_boundaries_map"))
 
-# Add layer control
-folium.LayerControl().add_to(m)
 
-# Display the map
-if not field_df.empty:
-    st_folium(m, width=None, height=700, key=k("field_boundaries_map"))
+if field_count:
+    render_field_map(data_version)
 else:
     st.info(
         "No field boundaries to display on map. Add boundaries from the Field Mapping page."
@@ -305,28 +453,26 @@ st.subheader("📤 Data Export")
 col1, col2, col3 = st.columns(3)
 
 with col1:
-    if not form_df.empty:
-        csv_form = form_df.to_csv(index=False)
+    if form_count:
         st.download_button(
             label="📄 Download Form Data (CSV)",
-            data=csv_form,
+            data=form_csv_bytes(data_version),
             file_name=f"form_responses_{datetime.now().strftime('%Y%m%d')}.csv",
             mime="text/csv",
             key=k("download_form_data"))
 
 with col2:
-    if not field_df.empty:
-        csv_field = field_df.to_csv(index=False)
+    if field_count:
         st.download_button(
             label="🗺️ Download Field Data (CSV)",
-            data=csv_field,
+            data=field_csv_bytes(data_version),
             file_name=
             f"field_boundaries_{datetime.now().strftime('%Y%m%d')}.csv",
             mime="text/csv",
             key=k("download_field_data"))
 
 with col3:
-    if not form_df.empty or not field_df.empty:
+    if form_count or field_count:
         # Combined summary report
         summary_data = {
             'metric': [
@@ -334,8 +480,8 @@ with col3:
                 'Data Collection Date'
             ],
             'value':
-            [len(form_df),
-             len(field_df),
+            [form_count,
+             field_count,
              datetime.now().strftime('%Y-%m-%d')]
         }
         summary_df = pd.DataFrame(summary_data)
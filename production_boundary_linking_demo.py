@@ -2,6 +2,15 @@ import sqlite3
 import json
 import pandas as pd
 from typing import Dict, List, Any, Optional
+from database.db_setup import create_indexes, decode_coordinates
+
+# orjson is much faster for the bulk form_data parsing below; its
+# JSONDecodeError subclasses json.JSONDecodeError so the handlers still apply
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
 
 class ProductionBoundaryLinker:
     """
@@ -11,6 +20,34 @@ class ProductionBoundaryLinker:
     
     def __init__(self, db_path: str = 'agricultural_data.db'):
         self.db_path = db_path
+        
+        # The farmer+crop lookups below rely on these; the database may not
+        # have been opened by the app (and so indexed) yet
+        conn = sqlite3.connect(self.db_path)
+        try:
+            create_indexes(conn)
+        except sqlite3.OperationalError as e:
+            print(f"Error creating indexes: {e}")
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _production_record(form_data: Dict, season_year: str, submission_date: str,
+                           farmer_id: str, crop_type: str) -> Optional[Dict]:
+        """Production figures for one crop of a parsed form, tagged with its context"""
+        crop_data = form_data.get('crop_data', {})
+        
+        if crop_type not in crop_data:
+            return None
+        
+        # Built in one go; a new dict either way, so the parsed form isn't mutated
+        return {
+            **crop_data[crop_type],
+            'season_year': season_year,
+            'submission_date': submission_date,
+            'farmer_id': farmer_id,
+            'crop_type': crop_type
+        }
     
     def get_crop_production_data(self, farmer_id: str, crop_type: str) -> Optional[Dict]:
         """Extract specific crop production data from JSON structure"""
@@ -28,21 +65,8 @@ class ProductionBoundaryLinker:
             if not result:
                 return None
             
-            form_data = json.loads(result[0])
-            crop_data = form_data.get('crop_data', {})
-            
-            if crop_type not in crop_data:
-                return None
-            
-            production_data = crop_data[crop_type].copy()
-            production_data.update({
-                'season_year': result[1],
-                'submission_date': result[2],
-                'farmer_id': farmer_id,
-                'crop_type': crop_type
-            })
-            
-            return production_data
+            return self._production_record(json.loads(result[0]), result[1], result[2],
+                                           farmer_id, crop_type)
             
         except (json.JSONDecodeError, Exception) as e:
             print(f"Error extracting crop data: {e}")
@@ -50,6 +74,21 @@ class ProductionBoundaryLinker:
         finally:
             conn.close()
     
+    @staticmethod
+    def _boundary_record(row) -> Dict:
+        """Boundary dict for an (id, field_name, field_type, coordinates,
+        area_estimate, notes, creation_date, crop_type) row"""
+        return {
+            'id': row[0],
+            'field_name': row[1],
+            'field_type': row[2],
+            'coordinates': decode_coordinates(row[3]),
+            'area_estimate': row[4],
+            'notes': row[5],
+            'creation_date': row[6],
+            'crop_type': row[7]
+        }
+    
     def get_field_boundaries_for_crop(self, farmer_id: str, crop_type: str) -> List[Dict]:
         """Get all field boundaries for a specific farmer+crop combination"""
         conn = sqlite3.connect(self.db_path)
@@ -64,19 +103,7 @@ class ProductionBoundaryLinker:
                 ORDER BY creation_date
             """, (farmer_id, crop_type))
             
-            boundaries = []
-            for row in cursor.fetchall():
-                boundary = {
-                    'id': row[0],
-                    'field_name': row[1],
-                    'field_type': row[2],
-                    'coordinates': json.loads(row[3]) if row[3] else [],
-                    'area_estimate': row[4],
-                    'notes': row[5],
-                    'creation_date': row[6],
-                    'crop_type': row[7]
-                }
-                boundaries.append(boundary)
+            boundaries = [self._boundary_record(row) for row in cursor.fetchall()]
             
             return boundaries
             
@@ -92,7 +119,12 @@ class ProductionBoundaryLinker:
         """
         production_data = self.get_crop_production_data(farmer_id, crop_type)
         boundaries = self.get_field_boundaries_for_crop(farmer_id, crop_type)
-        
+        return self._link(farmer_id, crop_type, production_data, boundaries)
+    
+    @staticmethod
+    def _link(farmer_id: str, crop_type: str, production_data: Optional[Dict],
+              boundaries: List[Dict]) -> Dict[str, Any]:
+        """Combine already-loaded production data and boundaries into a link result"""
         if not production_data:
             return {
                 'status': 'no_production_data',
@@ -128,62 +160,103 @@ class ProductionBoundaryLinker:
             }
         }
     
+    def _load_all(self):
+        """Read every form response and field boundary over a single connection"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            # id order, so the first row per farmer matches get_crop_production_data
+            forms = pd.read_sql_query("""
+                SELECT farmer_id, season_year, submission_date, form_data
+                FROM form_responses
+                ORDER BY id
+            """, conn)
+            bounds = pd.read_sql_query("""
+                SELECT id, field_name, field_type, coordinates,
+                       area_estimate, notes, creation_date, crop_type, farmer_id
+                FROM field_boundaries
+                ORDER BY creation_date
+            """, conn)
+        finally:
+            conn.close()
+        return forms, bounds
+    
     def get_all_farmer_crop_links(self) -> List[Dict[str, Any]]:
         """Get all possible farmer+crop combinations and their linking status"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Get all farmer+crop combinations from production data
-        cursor.execute("SELECT farmer_id, form_data FROM form_responses")
-        production_combinations = set()
+        # Two bulk reads joined in pandas, instead of two queries per combination
+        forms, bounds = self._load_all()
         
-        for row in cursor.fetchall():
-            farmer_id = row[0]
+        def parse(raw):
             try:
-                form_data = json.loads(row[1])
-                selected_crops = form_data.get('selected_crops', [])
-                for crop in selected_crops:
-                    production_combinations.add((farmer_id, crop))
+                return json_loads(raw)
             except json.JSONDecodeError:
-                continue
+                return None
         
-        # Get all farmer+crop combinations from boundary data
-        cursor.execute("SELECT DISTINCT farmer_id, crop_type FROM field_boundaries")
-        boundary_combinations = set(cursor.fetchall())
+        # Every form_data is parsed exactly once, in a single map over the column
+        forms['form_data'] = forms['form_data'].map(parse)
         
-        conn.close()
+        # Production figures come from each farmer's first form response
+        first_forms = forms.drop_duplicates('farmer_id').set_index('farmer_id')
+        
+        # Get all farmer+crop combinations from production data
+        valid_forms = forms[forms['form_data'].notna()]
+        production_combinations = (
+            valid_forms.assign(crop_type=valid_forms['form_data'].map(
+                lambda form_data: form_data.get('selected_crops', [])))
+            .explode('crop_type')
+            .dropna(subset=['crop_type'])
+            [['farmer_id', 'crop_type']]
+            .drop_duplicates())
+        
+        # Boundary dicts per farmer+crop, in creation order; NULLs become None
+        bounds = bounds.astype(object).where(bounds.notna(), None)
+        boundaries = {
+            key: [self._boundary_record(row) for row in group.itertuples(index=False)]
+            for key, group in bounds.groupby(['farmer_id', 'crop_type'], sort=False)
+        }
+        boundary_combinations = pd.DataFrame(list(boundaries),
+                                             columns=['farmer_id', 'crop_type'])
+        
+        # Outer join: the merge indicator says which side(s) each combination has
+        all_combinations = production_combinations.merge(
+            boundary_combinations, on=['farmer_id', 'crop_type'],
+            how='outer', indicator=True)
+        
+        def production_data(farmer_id, crop_type):
+            form = first_forms.loc[farmer_id]
+            if form['form_data'] is None:
+                return None
+            try:
+                return self._production_record(form['form_data'], form['season_year'],
+                                               form['submission_date'], farmer_id, crop_type)
+            except Exception as e:
+                print(f"Error extracting crop data: {e}")
+                return None
         
-        # Create comprehensive linking analysis
-        all_combinations = production_combinations.union(boundary_combinations)
         results = []
         
-        for farmer_id, crop_type in all_combinations:
-            has_production = (farmer_id, crop_type) in production_combinations
-            has_boundaries = (farmer_id, crop_type) in boundary_combinations
-            
-            if has_production and has_boundaries:
+        for farmer_id, crop_type, source in all_combinations.itertuples(index=False):
+            if source == 'both':
                 # Full linking possible
-                link_result = self.link_production_to_boundaries(farmer_id, crop_type)
-                results.append(link_result)
-            elif has_production:
+                results.append(self._link(farmer_id, crop_type,
+                                          production_data(farmer_id, crop_type),
+                                          boundaries[farmer_id, crop_type]))
+            elif source == 'left_only':
                 # Production only
-                production_data = self.get_crop_production_data(farmer_id, crop_type)
                 results.append({
                     'status': 'production_only',
                     'farmer_id': farmer_id,
                     'crop_type': crop_type,
-                    'production_data': production_data,
+                    'production_data': production_data(farmer_id, crop_type),
                     'field_boundaries': []
                 })
             else:
                 # Boundaries only
-                boundaries = self.get_field_boundaries_for_crop(farmer_id, crop_type)
                 results.append({
                     'status': 'boundaries_only',
                     'farmer_id': farmer_id,
                     'crop_type': crop_type,
                     'production_data': None,
-                    'field_boundaries': boundaries
+                    'field_boundaries': boundaries[farmer_id, crop_type]
                 })
         
         return results
@@ -201,29 +274,20 @@ class ProductionBoundaryLinker:
         total_production_records = len([r for r in all_links if r.get('production_data')])
         total_boundary_records = sum([len(r['field_boundaries']) for r in all_links])
         
-        # Crop-wise analysis
+        # Crop-wise analysis, aggregated per crop by pandas
         crop_analysis = {}
-        for result in fully_linked:
-            crop = result['crop_type']
-            if crop not in crop_analysis:
-                crop_analysis[crop] = {
-                    'farmers': set(),
-                    'total_area': 0,
-                    'total_production': 0,
-                    'total_value': 0,
-                    'fields': 0
-                }
-            
-            metrics = result['summary_metrics']
-            crop_analysis[crop]['farmers'].add(result['farmer_id'])
-            crop_analysis[crop]['total_area'] += metrics.get('total_area_acres', 0)
-            crop_analysis[crop]['total_production'] += metrics.get('quantity_harvested', 0)
-            crop_analysis[crop]['total_value'] += metrics.get('total_value', 0)
-            crop_analysis[crop]['fields'] += metrics.get('total_fields', 0)
-        
-        # Convert sets to counts
-        for crop in crop_analysis:
-            crop_analysis[crop]['farmers'] = len(crop_analysis[crop]['farmers'])
+        if fully_linked:
+            metrics = pd.DataFrame([
+                {'crop': r['crop_type'], 'farmer': r['farmer_id'], **r['summary_metrics']}
+                for r in fully_linked
+            ])
+            crop_analysis = metrics.groupby('crop', sort=False).agg(
+                farmers=('farmer', 'nunique'),
+                total_area=('total_area_acres', 'sum'),
+                total_production=('quantity_harvested', 'sum'),
+                total_value=('total_value', 'sum'),
+                fields=('total_fields', 'sum')
+            ).to_dict('index')
         
         return {
             'summary': {
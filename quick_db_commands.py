@@ -3,39 +3,31 @@
 Quick database commands for common operations
 """
 
-import sqlite3
 import pandas as pd
+from database.db_setup import get_connection, get_database_stats
 
-# Quick examples for common database operations:
+# Quick examples for common database operations. They all share the process-wide
+# connection from get_connection(), so running them together connects once.
 
 def show_all_farmers():
     """Show unique farmer IDs"""
-    conn = sqlite3.connect('agricultural_data.db')
-    df = pd.read_sql_query("SELECT DISTINCT farmer_id FROM form_responses ORDER BY farmer_id", conn)
-    conn.close()
+    df = pd.read_sql_query("SELECT DISTINCT farmer_id FROM form_responses ORDER BY farmer_id",
+                           get_connection())
     print("All farmer IDs:")
     print(df['farmer_id'].tolist())
 
 def count_records():
     """Show record counts"""
-    conn = sqlite3.connect('agricultural_data.db')
+    stats = get_database_stats()
+    if 'error' in stats:
+        print(f"Error counting records: {stats['error']}")
     
-    # Count form responses
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM form_responses")
-    form_count = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM field_boundaries")
-    field_count = cursor.fetchone()[0]
-    
-    conn.close()
-    
-    print(f"Form responses: {form_count}")
-    print(f"Field boundaries: {field_count}")
+    print(f"Form responses: {stats['form_responses']}")
+    print(f"Field boundaries: {stats['field_boundaries']}")
 
 def show_recent_data():
     """Show 3 most recent records from each table"""
-    conn = sqlite3.connect('agricultural_data.db')
+    conn = get_connection()
     
     print("=== Recent Form Responses ===")
     form_df = pd.read_sql_query("""
@@ -52,8 +44,6 @@ def show_recent_data():
         ORDER BY creation_date DESC LIMIT 3
     """, conn)
     print(field_df.to_string(index=False))
-    
-    conn.close()
 
 if __name__ == "__main__":
     print("=== Database Quick View ===")
@@ -0,0 +1,66 @@
+import atexit
+import json
+import os
+import tempfile
+import unittest
+
+from database import db_setup
+
+
+class CoordinatesTest(unittest.TestCase):
+    def test_blob_round_trip(self):
+        coordinates = [[-171.75, -13.9167], [-171.7412345, -13.91], [-171.74, -13.92]]
+        blob = db_setup.encode_coordinates(coordinates)
+        self.assertIsInstance(blob, bytes)
+        self.assertEqual(len(blob), 8 * 2 * len(coordinates))
+        self.assertEqual(db_setup.decode_coordinates(blob), coordinates)
+
+    def test_legacy_json_text(self):
+        coordinates = [[-171.75, -13.9167], [-171.74, -13.91], [-171.74, -13.92]]
+        self.assertEqual(db_setup.decode_coordinates(json.dumps(coordinates)), coordinates)
+
+    def test_empty_input(self):
+        self.assertEqual(db_setup.decode_coordinates(None), [])
+        self.assertEqual(db_setup.decode_coordinates(b''), [])
+        self.assertEqual(db_setup.decode_coordinates(''), [])
+        self.assertEqual(db_setup.decode_coordinates(db_setup.encode_coordinates([])), [])
+
+
+class ClearAllDataTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self._db_path = db_setup.DB_PATH
+        db_setup.DB_PATH = os.path.join(tmp.name, 'test.db')
+        db_setup.get_connection.cache_clear()
+        db_setup.init_database()
+        self.conn = db_setup.get_connection()
+        self.conn.executemany(
+            "INSERT INTO form_responses (farmer_id, district, village, season_year,"
+            " crop_type, form_data, submission_date) VALUES (?, 'd', 'v', '2024/25', 'Coconut', '{}', '2024-01-01')",
+            [('F001',), ('F002',)])
+
+    def tearDown(self):
+        atexit.unregister(db_setup.close_connection)
+        db_setup.close_connection(self.conn)
+        db_setup.get_connection.cache_clear()
+        db_setup.DB_PATH = self._db_path
+
+    def count_forms(self):
+        return self.conn.execute("SELECT COUNT(*) FROM form_responses").fetchone()[0]
+
+    def test_clears_rows(self):
+        self.assertTrue(db_setup.clear_all_data())
+        self.assertEqual(self.count_forms(), 0)
+
+    def test_vacuum_failure_still_reports_success(self):
+        # A statement left open on the shared connection makes VACUUM fail
+        cursor = self.conn.execute("SELECT * FROM form_responses")
+        cursor.fetchone()
+        self.assertTrue(db_setup.clear_all_data())
+        cursor.close()
+        self.assertEqual(self.count_forms(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+
+from utils.validators import is_season_year, sanitize_input, validate_form_data
+
+
+class SanitizeHtmlTest(unittest.TestCase):
+    def test_quoted_gt_stays_inside_tag(self):
+        self.assertEqual(sanitize_input('<a title="a>b">text</a>'), 'text')
+
+    def test_unclosed_quote_falls_back_to_plain_tag(self):
+        self.assertEqual(sanitize_input("<img src=x onerror=alert(1) title='<b>"), '')
+
+    def test_unclosed_quote_before_later_tag(self):
+        self.assertEqual(sanitize_input("x<'y<b>"), 'x')
+
+    def test_text_without_tags_is_unchanged(self):
+        self.assertEqual(sanitize_input('Planted 3 < 5 rows'), 'Planted 3 < 5 rows')
+
+
+class SanitizeSqlTest(unittest.TestCase):
+    def test_removal_that_creates_a_comment_marker(self):
+        # Dropping SELECT leaves "/*", which is stripped on the next pass
+        self.assertEqual(sanitize_input('/SELECT*'), '')
+
+    def test_removal_that_creates_a_keyword(self):
+        self.assertEqual(sanitize_input('DR/**/OP'), '')
+
+    def test_plain_text_is_unchanged(self):
+        self.assertEqual(sanitize_input('  Planted taro near the river  '), 'Planted taro near the river')
+
+
+class SeasonYearTest(unittest.TestCase):
+    def test_valid(self):
+        self.assertTrue(is_season_year('2024/25'))
+        self.assertTrue(is_season_year('2024/2025'))
+
+    def test_end_too_short_or_long(self):
+        self.assertFalse(is_season_year('2024/2'))
+        self.assertFalse(is_season_year('2024/25555'))
+
+    def test_malformed(self):
+        for value in ('2024-25', '2024/25/', '/25', '24/25', '2024/25\n'):
+            self.assertFalse(is_season_year(value), value)
+
+    def test_non_ascii_digits_match_regex_digits(self):
+        # Same digits as the \d the check replaced: decimal digits from any
+        # script pass, superscripts don't
+        self.assertTrue(is_season_year('\uff12\uff10\uff12\uff14/\uff12\uff15'))
+        self.assertTrue(is_season_year('\u0662\u0660\u0662\u0664/\u0662\u0665'))
+        self.assertFalse(is_season_year('2024/\u00b2\u2075'))
+
+
+def valid_form(**overrides):
+    data = {
+        'farmer_id': 'F001',
+        'district': 'Upolu',
+        'village': 'Apia',
+        'season_year': '2024/25',
+        'selected_crops': ['Coconut', 'Banana'],
+        'crop_data': {
+            'Coconut': {'growth_mode': 'Mixed', 'qty_harvested': 10, 'unit': 'Each'},
+            'Banana': {'banana_type': 'Cooking', 'growth_mode': 'Mixed'},
+        },
+    }
+    data.update(overrides)
+    return data
+
+
+class ValidateFormDataTest(unittest.TestCase):
+    def test_valid(self):
+        self.assertEqual(validate_form_data(valid_form(), fail_fast=True),
+                         (True, "Validation successful"))
+
+    def test_fail_fast_stops_after_form_fields(self):
+        data = valid_form(farmer_id='', season_year='2024',
+                          crop_data={'Coconut': {'growth_mode': 'Select...'}})
+        self.assertEqual(validate_form_data(data, fail_fast=True),
+                         (False, "Farmer ID is required"))
+        self.assertEqual(validate_form_data(data), (False, "; ".join([
+            "Farmer ID is required",
+            "Season/Year must be in format YYYY/YY or YYYY/YYYY (e.g., 2024/25)",
+            "Growth mode is required for Coconut",
+        ])))
+
+    def test_fail_fast_stops_after_first_failing_crop(self):
+        data = valid_form(crop_data={
+            'Coconut': {'growth_mode': 'Select...', 'qty_harvested': -1},
+            'Banana': {'banana_type': 'Select...', 'growth_mode': 'Mixed'},
+        })
+        self.assertEqual(validate_form_data(data, fail_fast=True),
+                         (False, "Growth mode is required for Coconut"))
+        self.assertEqual(validate_form_data(data), (False, "; ".join([
+            "Growth mode is required for Coconut",
+            "Quantity harvested cannot be negative for Coconut",
+            "Banana type is required for Banana",
+        ])))
+
+    def test_fail_fast_checks_later_crops(self):
+        data = valid_form(crop_data={
+            'Coconut': {'growth_mode': 'Mixed'},
+            'Banana': {'banana_type': 'Cooking', 'growth_mode': 'Mixed',
+                       'qty_harvested': 5, 'unit': 'Select...'},
+        })
+        self.assertEqual(validate_form_data(data, fail_fast=True), (False,
+            "Unit is required when quantity harvested is provided for Banana"))
+
+
+if __name__ == '__main__':
+    unittest.main()
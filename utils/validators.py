@@ -1,19 +1,87 @@
+import itertools
 import re
+from typing import Any, Dict, List, Tuple
 
-def validate_form_data(data):
-    """Validate form data before saving to database"""
+import numpy as np
+
+# Patterns are compiled once at import; calling their bound methods skips the
+# re module's per-call cache lookup
+FARMER_ID_RE = re.compile(r'^[a-zA-Z0-9\-_]+$')
+FIELD_NAME_RE = re.compile(r'^[a-zA-Z0-9\s\-_\.]+$')
+# HTML tags, with quoted attribute values treated as opaque so a '>' inside one
+# (title="a>b") doesn't end the tag early. Unrolled as runs of plain characters
+# between quoted values so no character can be matched two ways and matching
+# stays linear. Where that can't parse a tag (e.g. an unclosed quote) the plain
+# '<' to '>' form is tried at the same '<', so nothing it used to strip is kept.
+HTML_TAG_RE = re.compile(r'''<(?!>)[^'">]*(?:(?:"[^"]*"|'[^']*')[^'">]*)*>|<[^>]+>''')
+
+# Basic SQL injection patterns stripped by sanitize_input, fused into a single
+# alternation so the text is scanned (and copied) once instead of once per pattern
+SQL_INJECTION_RE = re.compile(
+    r'\b(?:SELECT|INSERT|UPDATE|DELETE|DROP|CREATE|ALTER|EXEC|EXECUTE)\b'
+    r'|--|#|/\*|\*/'
+    r'|\bOR\b.*=.*\bOR\b'
+    r'|\bAND\b.*=.*\bAND\b',
+    re.IGNORECASE)
+
+# google-re2 is a linear-time DFA engine; on prose Python's engine retries every
+# \b-anchored alternative at each position, so re2 is several times faster past
+# a few dozen characters. Only used for ASCII text, where its ASCII-only \b and
+# case folding agree with re's. Below RE2_MIN_LENGTH its call overhead dominates.
+try:
+    import re2
+    SQL_INJECTION_RE2 = re2.compile('(?i)' + SQL_INJECTION_RE.pattern)
+except ImportError:
+    SQL_INJECTION_RE2 = None
+RE2_MIN_LENGTH = 64
+
+# Every SQL_INJECTION_RE match contains one of these characters or keywords, so
+# ASCII text with none of them can skip the regex entirely
+SQL_SUSPECT_CHARS = frozenset('-#/*=')
+SQL_KEYWORDS = ('select', 'insert', 'update', 'delete', 'drop', 'create', 'alter', 'exec')
+
+# Fields every form response must fill in, as (field, label) pairs
+REQUIRED_FORM_FIELDS = (
+    ('farmer_id', 'Farmer ID'),
+    ('district', 'District'),
+    ('village', 'Village'),
+    ('season_year', 'Season/Year'),
+)
+
+# Per-crop required fields as (field, label) pairs, looked up once per crop
+# instead of walking an if/elif chain: dropdowns that must not be left on
+# "Select...", and text fields that must be filled in
+CROP_REQUIRED_SELECTS = {
+    'Coconut': (('growth_mode', 'Growth mode'),),
+    'Cocoa': (('growth_mode', 'Growth mode'),),
+    'Breadfruit': (('growth_mode', 'Growth mode'),),
+    'Banana': (('banana_type', 'Banana type'), ('growth_mode', 'Growth mode')),
+}
+CROP_REQUIRED_TEXT = {
+    'Other': (('other_crop_name', 'Crop name'),),
+}
+
+def is_season_year(value: str) -> bool:
+    """Whether value is a YYYY/YY-style season: 4 digits, '/', then 2-4 digits"""
+    # Plain str methods instead of a regex for this fixed shape; isdecimal()
+    # accepts the same digits as the \d it replaces
+    start, slash, end = value.partition('/')
+    return (bool(slash) and len(start) == 4 and 2 <= len(end) <= 4
+            and start.isdecimal() and end.isdecimal())
+
+def validate_form_data(data: Dict[str, Any], fail_fast: bool = False) -> Tuple[bool, str]:
+    """Validate form data before saving to database
+
+    With fail_fast, validation stops at the first failing section (the form
+    fields, then each crop in turn) and only the first error is returned, so
+    bulk imports don't validate every crop of a row that is already rejected.
+    """
     errors = []
     
-    # Required field validation
-    required_fields = {
-        'farmer_id': 'Farmer ID',
-        'district': 'District',
-        'village': 'Village',
-        'season_year': 'Season/Year'
-    }
-    
-    for field, label in required_fields.items():
-        if not data.get(field) or data[field] == "Select..." or data[field] == "":
+    # Required field validation; each value is read once ("" is already falsy)
+    for field, label in REQUIRED_FORM_FIELDS:
+        value = data.get(field)
+        if not value or value == "Select...":
             errors.append(f"{label} is required")
     
     # Check if at least one crop is selected
@@ -22,67 +90,68 @@ def validate_form_data(data):
         errors.append("At least one crop must be selected")
     
     # Specific validation rules
-    if data.get('farmer_id'):
-        if len(data['farmer_id'].strip()) < 3:
+    farmer_id = data.get('farmer_id')
+    if farmer_id:
+        if len(farmer_id.strip()) < 3:
             errors.append("Farmer ID must be at least 3 characters long")
-        if not re.match(r'^[a-zA-Z0-9\-_]+$', data['farmer_id']):
+        if not FARMER_ID_RE.match(farmer_id):
             errors.append("Farmer ID can only contain letters, numbers, hyphens, and underscores")
     
-    if data.get('ea_code'):
-        if not re.match(r'^[0-9]+$', data['ea_code']):
+    ea_code = data.get('ea_code')
+    if ea_code:
+        if not (ea_code.isascii() and ea_code.isdigit()):
             errors.append("EA Code must contain only numbers")
     
-    if data.get('season_year'):
-        if not re.match(r'^\d{4}/\d{2,4}$', data['season_year']):
+    season_year = data.get('season_year')
+    if season_year:
+        if not is_season_year(season_year):
             errors.append("Season/Year must be in format YYYY/YY or YYYY/YYYY (e.g., 2024/25)")
     
+    if fail_fast and errors:
+        return False, errors[0]
+    
     # Crop-specific validation for each selected crop
     crop_data = data.get('crop_data', {})
-    selected_crops = data.get('selected_crops', [])
     
     for crop_type in selected_crops:
         crop_info = crop_data.get(crop_type, {})
         
         # Validate crop-specific required fields
-        if crop_type == "Coconut":
-            if crop_info.get('growth_mode') == "Select...":
-                errors.append(f"Growth mode is required for {crop_type}")
-        elif crop_type == "Cocoa":
-            if crop_info.get('growth_mode') == "Select...":
-                errors.append(f"Growth mode is required for {crop_type}")
-        elif crop_type == "Breadfruit":
-            if crop_info.get('growth_mode') == "Select...":
-                errors.append(f"Growth mode is required for {crop_type}")
-        elif crop_type == "Banana":
-            if crop_info.get('banana_type') == "Select...":
-                errors.append(f"Banana type is required for {crop_type}")
-            if crop_info.get('growth_mode') == "Select...":
-                errors.append(f"Growth mode is required for {crop_type}")
-        elif crop_type == "Other":
-            if not crop_info.get('other_crop_name'):
-                errors.append(f"Crop name is required for {crop_type}")
+        for field, label in CROP_REQUIRED_SELECTS.get(crop_type, ()):
+            if crop_info.get(field) == "Select...":
+                errors.append(f"{label} is required for {crop_type}")
+        for field, label in CROP_REQUIRED_TEXT.get(crop_type, ()):
+            if not crop_info.get(field):
+                errors.append(f"{label} is required for {crop_type}")
         
-        # Validate production fields for each crop
-        if crop_info.get('qty_harvested') is not None:
-            if crop_info['qty_harvested'] < 0:
+        # Validate production fields for each crop; each value is read once
+        qty = crop_info.get('qty_harvested')
+        if qty is not None:
+            if qty < 0:
                 errors.append(f"Quantity harvested cannot be negative for {crop_type}")
-            if crop_info['qty_harvested'] > 1000000:
+            if qty > 1000000:
                 errors.append(f"Quantity harvested seems unrealistic for {crop_type} (max 1,000,000)")
         
-        if crop_info.get('price_per_unit') is not None:
-            if crop_info['price_per_unit'] < 0:
+        price = crop_info.get('price_per_unit')
+        if price is not None:
+            if price < 0:
                 errors.append(f"Price per unit cannot be negative for {crop_type}")
-            if crop_info['price_per_unit'] > 10000:
+            if price > 10000:
                 errors.append(f"Price per unit seems unrealistic for {crop_type} (max $10,000)")
         
-        if crop_info.get('area_acres') is not None and crop_info['area_acres'] > 0:
-            if crop_info['area_acres'] > 10000:
+        area = crop_info.get('area_acres')
+        if area is not None and area > 0:
+            if area > 10000:
                 errors.append(f"Area in acres seems unrealistic for {crop_type} (max 10,000 acres)")
         
         # Check production fields have units if quantity is provided
-        if crop_info.get('qty_harvested') and crop_info.get('qty_harvested') > 0:
-            if crop_info.get('unit') == "Select..." or not crop_info.get('unit'):
+        if qty and qty > 0:
+            unit = crop_info.get('unit')
+            if unit == "Select..." or not unit:
                 errors.append(f"Unit is required when quantity harvested is provided for {crop_type}")
+        
+        if fail_fast and errors:
+            return False, errors[0]
     
     # Return validation result
     if errors:
@@ -90,36 +159,41 @@ def validate_form_data(data):
     else:
         return True, "Validation successful"
 
-def validate_field_boundary(data):
+def validate_field_boundary(data: Dict[str, Any]) -> Tuple[bool, str]:
     """Validate field boundary data before saving"""
     errors = []
     
     # Required fields
-    if not data.get('field_name') or len(data['field_name'].strip()) < 1:
+    field_name = data.get('field_name')
+    if not field_name or not field_name.strip():
         errors.append("Field name is required")
     
-    if not data.get('field_type') or data['field_type'] == "Select...":
+    field_type = data.get('field_type')
+    if not field_type or field_type == "Select...":
         errors.append("Field type is required")
     
-    if not data.get('coordinates') or len(data['coordinates']) < 3:
+    coordinates = data.get('coordinates')
+    if not coordinates or len(coordinates) < 3:
         errors.append("Field boundary must have at least 3 points")
     
     # Field name validation
-    if data.get('field_name'):
-        if len(data['field_name']) > 100:
+    if field_name:
+        if len(field_name) > 100:
             errors.append("Field name must be less than 100 characters")
-        if not re.match(r'^[a-zA-Z0-9\s\-_\.]+$', data['field_name']):
+        if not FIELD_NAME_RE.match(field_name):
             errors.append("Field name contains invalid characters")
     
     # Area validation
-    if data.get('area_estimate'):
-        if data['area_estimate'] <= 0:
+    area_estimate = data.get('area_estimate')
+    if area_estimate:
+        if area_estimate <= 0:
             errors.append("Area estimate must be greater than 0")
-        if data['area_estimate'] > 10000:
+        if area_estimate > 10000:
             errors.append("Area estimate seems unrealistic (max 10,000 acres)")
     
     # Notes length check
-    if data.get('notes') and len(data['notes']) > 500:
+    notes = data.get('notes')
+    if notes and len(notes) > 500:
         errors.append("Notes must be less than 500 characters")
     
     # Return validation result
@@ -128,7 +202,7 @@ def validate_field_boundary(data):
     else:
         return True, "Validation successful"
 
-def sanitize_input(text):
+def sanitize_input(text: Any) -> str:
     """Sanitize text input to prevent basic security issues"""
     if not text:
         return ""
@@ -137,22 +211,34 @@ def sanitize_input(text):
     sanitized = str(text).strip()
     
     # Remove HTML tags
-    sanitized = re.sub(r'<[^>]+>', '', sanitized)
+    if '<' in sanitized:
+        sanitized = HTML_TAG_RE.sub('', sanitized)
+    
+    # Most input is plain text, so rule out a match with cheap str checks first.
+    # Non-ASCII text always goes to the regex: IGNORECASE folds some non-ASCII
+    # letters (e.g. "ſ") onto ASCII ones, which lower() doesn't.
+    if (sanitized.isascii() and SQL_SUSPECT_CHARS.isdisjoint(sanitized)
+            and not any(keyword in sanitized.lower() for keyword in SQL_KEYWORDS)):
+        return sanitized
     
-    # Remove SQL injection patterns (basic)
-    dangerous_patterns = [
-        r'(\b(SELECT|INSERT|UPDATE|DELETE|DROP|CREATE|ALTER|EXEC|EXECUTE)\b)',
-        r'(--|#|\/\*|\*\/)',
-        r'(\bOR\b.*=.*\bOR\b)',
-        r'(\bAND\b.*=.*\bAND\b)'
-    ]
+    pattern = SQL_INJECTION_RE
+    if (SQL_INJECTION_RE2 is not None and len(sanitized) >= RE2_MIN_LENGTH
+            and sanitized.isascii()):
+        pattern = SQL_INJECTION_RE2
     
-    for pattern in dangerous_patterns:
-        sanitized = re.sub(pattern, '', sanitized, flags=re.IGNORECASE)
+    # Remove SQL injection patterns (basic). Repeat while anything was removed:
+    # dropping a keyword can join its neighbours into a new match (e.g. "/*")
+    removed = 1
+    while removed:
+        sanitized, removed = pattern.subn('', sanitized)
     
     return sanitized
 
-def validate_coordinates(coordinates):
+# Boundaries with at least this many points are range-checked with numpy; below
+# it the plain loop wins (numpy costs ~10 us per call before doing any work)
+VECTORIZE_MIN_POINTS = 200
+
+def validate_coordinates(coordinates: List[List[float]]) -> Tuple[bool, str]:
     """Validate coordinate data for field boundaries"""
     if not coordinates or not isinstance(coordinates, list):
         return False, "Invalid coordinates format"
@@ -163,6 +249,23 @@ def validate_coordinates(coordinates):
     if len(coordinates) > 1000:
         return False, "Too many coordinate points (max 1000)"
     
+    # Large boundaries: check the structure with C-level map()s, then stream every
+    # value into one float64 array and bounds-check it in two vectorized
+    # comparisons. Anything unusual falls through to the per-point loop below,
+    # which reports the first offending point. Small boundaries (the usual
+    # case) go straight to the loop, which is cheaper than numpy's setup cost.
+    if (len(coordinates) >= VECTORIZE_MIN_POINTS
+            and set(map(type, coordinates)) == {list}
+            and set(map(len, coordinates)) == {2}):
+        try:
+            points = np.fromiter(itertools.chain.from_iterable(coordinates),
+                                 np.float64, 2 * len(coordinates)).reshape(-1, 2)
+        except (ValueError, TypeError):
+            points = None
+        if (points is not None and np.all(np.abs(points[:, 0]) <= 90)
+                and np.all(np.abs(points[:, 1]) <= 180)):
+            return True, "Coordinates are valid"
+    
     for coord in coordinates:
         if not isinstance(coord, list) or len(coord) != 2:
             return False, "Each coordinate must have latitude and longitude"